@@ -0,0 +1,70 @@
+# scripts/bench_json_io.py
+# -*- coding: utf-8 -*-
+"""
+benchmark لطبقة json_io: وقت load/dump لكل backend متوفر (orjson / stdlib)
+على ملفات matches/*.json الحقيقية ونسخ اصطناعية أكبر ×N (افتراضي 100).
+
+  python scripts/bench_json_io.py
+  python scripts/bench_json_io.py --scale 100 --repeat 20
+"""
+import argparse
+import time
+from pathlib import Path
+
+from json_io import BACKENDS, dumps, loads
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+MATCHES_DIR = REPO_ROOT / "matches"
+REAL_FILES = ("filtered_matches.json", "liveonsat_raw.json", "notified.json")
+
+
+def scale_payload(obj, n: int):
+    """يكبّر الملف ×n: قوائم matches تتكرر، و dict بسيط (notified) ينسخ مفاتيحه بلاحقة."""
+    if isinstance(obj, dict) and isinstance(obj.get("matches"), list):
+        return dict(obj, matches=obj["matches"] * n)
+    if isinstance(obj, dict):
+        return {f"{k}#{i}": v for i in range(n) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return obj * n
+    return obj
+
+
+def best_ms(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, (time.perf_counter() - t0) * 1000)
+    return best
+
+
+def bench_one(label: str, raw: bytes, repeat: int):
+    obj = loads(raw, backend="stdlib")
+    row = [f"{label:<34}", f"{len(raw) / 1024:>9.1f}"]
+    for b in BACKENDS:
+        load_ms = best_ms(lambda: loads(raw, backend=b), repeat)
+        dump_ms = best_ms(lambda: dumps(obj, pretty=True, backend=b), repeat)
+        row.append(f"{b}: load={load_ms:8.3f} dump={dump_ms:8.3f}")
+    print("  ".join(row))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="json_io load/dump benchmark")
+    ap.add_argument("--scale", type=int, default=100)
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+
+    print(f"[i] backends: {', '.join(BACKENDS)} | best of {args.repeat} (ms)")
+    print(f"{'file':<34}  {'size KB':>9}")
+    for name in REAL_FILES:
+        path = MATCHES_DIR / name
+        if not path.exists():
+            continue
+        raw = path.read_bytes()
+        bench_one(name, raw, args.repeat)
+        big = dumps(scale_payload(loads(raw, backend="stdlib"), args.scale), backend="stdlib")
+        bench_one(f"{name} ×{args.scale}", big, max(1, args.repeat // 2))
+
+
+if __name__ == "__main__":
+    main()
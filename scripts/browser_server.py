@@ -0,0 +1,242 @@
+# scripts/browser_server.py
+# -*- coding: utf-8 -*-
+"""
+متصفح Chromium دافئ وطويل العمر للسحب المتكرر:
+  python scripts/browser_server.py            # يسمع على 127.0.0.1:9230
+  BROWSER_SERVER_URL=http://127.0.0.1:9230 python scripts/scrape_liveonsat_only.py
+
+- Chromium يشتغل مرة وحدة، وفيه pool من contexts جاهزة موزّعة على UA_POOL (بالتناوب).
+- GET /html?url=...&timeout_ms=...&debug=0|1  -> HTML (نفس fetch_page_html)
+- GET /healthz                                -> حالة المتصفح/الذاكرة
+- فحص صحة دوري + إعادة تشغيل تلقائية إذا المتصفح وقع، أو الذاكرة (RSS) تجاوزت الحد،
+  أو صار عمره أكثر من BROWSER_MAX_AGE_S.
+
+Playwright (sync) مو thread-safe، فالسيرفر خيط واحد وكل الطلبات تمشي بالتسلسل
+(السحب أصلاً طلب كل عدة دقائق).
+"""
+import itertools
+import os
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from playwright.sync_api import sync_playwright
+
+from json_io import dumps
+from scrape_liveonsat_only import UA_POOL, fetch_page_html, launch_browser, new_scrape_context
+
+# ========= إعدادات =========
+HOST = os.environ.get("BROWSER_SERVER_HOST", "127.0.0.1")
+PORT = int(os.environ.get("BROWSER_SERVER_PORT", "9230"))
+POOL_PER_UA = int(os.environ.get("BROWSER_POOL_PER_UA", "1"))
+CONTEXT_MAX_USES = int(os.environ.get("BROWSER_CONTEXT_MAX_USES", "20"))
+MAX_RSS_MB = float(os.environ.get("BROWSER_MAX_RSS_MB", "1500"))
+MAX_AGE_S = float(os.environ.get("BROWSER_MAX_AGE_S", str(6 * 3600)))
+HEALTH_INTERVAL_S = float(os.environ.get("BROWSER_HEALTH_INTERVAL_S", "30"))
+
+
+def process_tree_rss_mb(root_pid: int):
+    """
+    مجموع VmRSS لكل العمليات تحت root_pid (driver + Chromium) من /proc.
+    يرجّع None إذا /proc مو متوفر (مو Linux).
+    """
+    proc = Path("/proc")
+    if not proc.is_dir():
+        return None
+    children, rss = {}, {}
+    for d in proc.iterdir():
+        if not d.name.isdigit():
+            continue
+        try:
+            status = (d / "status").read_text()
+        except OSError:
+            continue
+        ppid, kb = None, 0
+        for line in status.splitlines():
+            if line.startswith("PPid:"):
+                ppid = int(line.split()[1])
+            elif line.startswith("VmRSS:"):
+                kb = int(line.split()[1])
+        pid = int(d.name)
+        rss[pid] = kb
+        if ppid is not None:
+            children.setdefault(ppid, []).append(pid)
+
+    total, stack = 0, list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total / 1024
+
+
+# ========= المتصفح الدافئ =========
+class WarmBrowser:
+    def __init__(self):
+        self._pw_cm = None
+        self._pw = None
+        self.browser = None
+        self.pool = []        # [{"ua", "ctx", "uses"}]
+        self._rr = None
+        self.started_at = None
+        self.restarts = 0
+        self.fetches = 0
+
+    # --- دورة الحياة ---
+    def start(self):
+        t0 = time.perf_counter()
+        self._pw_cm = sync_playwright()
+        self._pw = self._pw_cm.__enter__()
+        self.browser = launch_browser(self._pw)
+        self.pool = [
+            {"ua": ua, "ctx": new_scrape_context(self.browser, ua), "uses": 0}
+            for ua in UA_POOL for _ in range(POOL_PER_UA)
+        ]
+        self._rr = itertools.cycle(range(len(self.pool)))
+        self.started_at = time.time()
+        print(f"[browser] started: {len(self.pool)} contexts in {(time.perf_counter() - t0) * 1000:.0f}ms")
+
+    def stop(self):
+        for slot in self.pool:
+            try:
+                slot["ctx"].close()
+            except Exception:
+                pass
+        self.pool = []
+        if self.browser is not None:
+            try:
+                self.browser.close()
+            except Exception:
+                pass
+        self.browser = None
+        if self._pw_cm is not None:
+            try:
+                self._pw_cm.__exit__(None, None, None)
+            except Exception:
+                pass
+        self._pw_cm = self._pw = None
+
+    def restart(self, reason: str):
+        print(f"[browser] restart: {reason}")
+        self.stop()
+        self.start()
+        self.restarts += 1
+
+    # --- الصحة ---
+    def health(self) -> dict:
+        return {
+            "connected": bool(self.browser and self.browser.is_connected()),
+            "rss_mb": process_tree_rss_mb(os.getpid()),
+            "age_s": time.time() - self.started_at if self.started_at else None,
+            "contexts": len(self.pool),
+            "fetches": self.fetches,
+            "restarts": self.restarts,
+        }
+
+    def ensure_healthy(self):
+        h = self.health()
+        if not h["connected"]:
+            self.restart("browser disconnected")
+        elif h["rss_mb"] is not None and h["rss_mb"] > MAX_RSS_MB:
+            self.restart(f"rss {h['rss_mb']:.0f}MB > {MAX_RSS_MB:.0f}MB")
+        elif h["age_s"] is not None and h["age_s"] > MAX_AGE_S:
+            self.restart(f"age {h['age_s']:.0f}s > {MAX_AGE_S:.0f}s")
+
+    # --- الـ pool ---
+    def _next_slot(self) -> dict:
+        slot = self.pool[next(self._rr)]
+        if slot["uses"] >= CONTEXT_MAX_USES:
+            # context قديم: نبدّله بواحد نظيف (كوكيز/كاش) بنفس الـ UA
+            try:
+                slot["ctx"].close()
+            except Exception:
+                pass
+            slot["ctx"] = new_scrape_context(self.browser, slot["ua"])
+            slot["uses"] = 0
+        return slot
+
+    def fetch(self, url: str, timeout_ms: int, debug: bool) -> str:
+        self.ensure_healthy()
+        slot = self._next_slot()
+        print(f"[browser] GET {url} UA={slot['ua'][:35]}... uses={slot['uses']}")
+        try:
+            html = fetch_page_html(slot["ctx"], url, timeout_ms, debug)
+        except Exception:
+            # إذا المتصفح نفسه وقع أثناء الطلب نعيد تشغيله للطلب الجاي
+            if not (self.browser and self.browser.is_connected()):
+                self.restart("crashed during fetch")
+            raise
+        finally:
+            slot["uses"] += 1
+        self.fetches += 1
+        return html
+
+
+WARM = WarmBrowser()
+
+
+# ========= الـ handler =========
+class BrowserHandler(BaseHTTPRequestHandler):
+    server_version = "liveonsat-browser/1"
+
+    def _send(self, code: int, payload: bytes, ctype: str):
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        qs = parse_qs(parts.query)
+
+        if parts.path == "/healthz":
+            self._send(200, dumps(WARM.health(), pretty=False), "application/json")
+            return
+
+        if parts.path != "/html":
+            self._send(404, b'{"error":"not found"}', "application/json")
+            return
+
+        url = (qs.get("url") or [""])[0]
+        if not url:
+            self._send(400, b'{"error":"missing url"}', "application/json")
+            return
+        timeout_ms = int((qs.get("timeout_ms") or ["90000"])[0])
+        debug = (qs.get("debug") or ["0"])[0] == "1"
+
+        t0 = time.perf_counter()
+        try:
+            html = WARM.fetch(url, timeout_ms, debug)
+        except Exception as e:
+            print(f"[browser] fetch failed: {e}")
+            self._send(502, dumps({"error": str(e)[:500]}, pretty=False), "application/json")
+            return
+        print(f"[browser] done in {(time.perf_counter() - t0) * 1000:.0f}ms ({len(html)} chars)")
+        self._send(200, html.encode("utf-8"), "text/html; charset=utf-8")
+
+
+# ========= الرئيسي =========
+def main():
+    WARM.start()
+    httpd = HTTPServer((HOST, PORT), BrowserHandler)
+    # handle_request بمهلة → فحص صحة دوري بنفس الخيط (Playwright sync)
+    httpd.timeout = HEALTH_INTERVAL_S
+    print(f"[browser] serving on http://{HOST}:{PORT}")
+    try:
+        while True:
+            httpd.handle_request()
+            try:
+                WARM.ensure_healthy()
+            except Exception as e:
+                print(f"[browser] health check failed: {e}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        WARM.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# scripts/eval_matchers.py
+# -*- coding: utf-8 -*-
+"""
+مقارنة محركات المطابقة (MATCHER_ENGINES) على أزواج يلا↔liveonsat معلّمة:
+precision / recall + latency لكل مباراة + ذاكرة (tracemalloc peak).
+الـ latency والذاكرة بتمريرات منفصلة: tracemalloc يبطّئ كل allocation فيخرّب الـ ms.
+
+  python scripts/eval_matchers.py                          # matches/labels/*.json
+  python scripts/eval_matchers.py --labels a.json b.json --repeat 20
+
+شكل ملف التعليم:
+  {
+    "liveonsat": {...نفس liveonsat_raw.json...},
+    "pairs": [{"yalla": {...مباراة يلا...}, "live_title": "Home v Away" | null}]
+  }
+live_title = null يعني المباراة مو موجودة بـ liveonsat (أي اختيار = false positive).
+"""
+import argparse
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from filter_json import (
+    MATCHER_ENGINES,
+    REPO_ROOT,
+    build_live_index,
+    infer_site_offset,
+    match_yalla_to_live,
+    normalize_cached,
+)
+from json_io import read_json
+
+DEFAULT_LABELS_DIR = REPO_ROOT / "matches" / "labels"
+
+
+def load_label_sets(paths: list[Path]) -> list[dict]:
+    sets = []
+    for p in paths:
+        data = read_json(p)
+        live_idx = build_live_index(data.get("liveonsat") or {"matches": []})
+        pairs = data.get("pairs") or []
+        offsets, _ = infer_site_offset([pr["yalla"] for pr in pairs], live_idx)
+        sets.append({"name": p.name, "live_idx": live_idx, "offsets": offsets, "pairs": pairs})
+    return sets
+
+
+def evaluate_engine(engine_fn, label_sets: list[dict], repeat: int = 1) -> dict:
+    tp = fp = fn = 0
+    lat_ms = []
+    misses = []
+
+    # 1) الدقة + latency (بدون tracemalloc)
+    for ls in label_sets:
+        for pr in ls["pairs"]:
+            best = None
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                best, _meta = match_yalla_to_live(pr["yalla"], ls["live_idx"], ls["offsets"], engine_fn)
+                lat_ms.append((time.perf_counter() - t0) * 1000)
+
+            want = pr.get("live_title")
+            got = best.get("title") if best else None
+            if got is not None and got == want:
+                tp += 1
+            else:
+                if got is not None:
+                    fp += 1
+                if want is not None:
+                    fn += 1
+                misses.append(f"{ls['name']}: {pr['yalla'].get('home_team')} × {pr['yalla'].get('away_team')} "
+                              f"-> got={got!r} want={want!r}")
+
+    # 2) الذاكرة: تمريرة وحدة منفصلة تحت tracemalloc (كاش التطبيع فارغ مثل أول تشغيل)
+    normalize_cached.cache_clear()
+    tracemalloc.start()
+    for ls in label_sets:
+        for pr in ls["pairs"]:
+            match_yalla_to_live(pr["yalla"], ls["live_idx"], ls["offsets"], engine_fn)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    lat_sorted = sorted(lat_ms)
+    return {
+        "precision": tp / (tp + fp) if (tp + fp) else 0.0,
+        "recall": tp / (tp + fn) if (tp + fn) else 0.0,
+        "tp": tp, "fp": fp, "fn": fn,
+        "lat_mean_ms": statistics.mean(lat_ms) if lat_ms else 0.0,
+        "lat_p95_ms": lat_sorted[int(0.95 * (len(lat_sorted) - 1))] if lat_sorted else 0.0,
+        "mem_peak_kb": peak / 1024,
+        "misses": misses,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Accuracy vs latency for matcher engines")
+    ap.add_argument("--labels", type=Path, nargs="*", default=None)
+    ap.add_argument("--engines", nargs="*", default=None, help=f"افتراضي الكل: {', '.join(MATCHER_ENGINES)}")
+    ap.add_argument("--repeat", type=int, default=5, help="تكرار كل مباراة لقياس latency أثبت")
+    ap.add_argument("--show-misses", action="store_true")
+    args = ap.parse_args()
+
+    paths = args.labels or sorted(DEFAULT_LABELS_DIR.glob("*.json"))
+    if not paths:
+        print(f"[x] no label files (looked in {DEFAULT_LABELS_DIR})")
+        raise SystemExit(1)
+
+    label_sets = load_label_sets(paths)
+    n_pairs = sum(len(ls["pairs"]) for ls in label_sets)
+    print(f"[i] label sets: {len(label_sets)} | pairs: {n_pairs}")
+
+    names = args.engines or list(MATCHER_ENGINES)
+    print(f"{'engine':<12} {'prec':>6} {'recall':>6} {'tp/fp/fn':>10} {'mean ms':>9} {'p95 ms':>8} {'peak KB':>8}")
+    for name in names:
+        if name not in MATCHER_ENGINES:
+            print(f"{name:<12} (unknown / not installed)")
+            continue
+        r = evaluate_engine(MATCHER_ENGINES[name], label_sets, max(1, args.repeat))
+        print(f"{name:<12} {r['precision']:>6.3f} {r['recall']:>6.3f} {r['tp']:>3}/{r['fp']}/{r['fn']:<4} "
+              f"{r['lat_mean_ms']:>9.3f} {r['lat_p95_ms']:>8.3f} {r['mem_peak_kb']:>8.1f}")
+        if args.show_misses:
+            for miss in r["misses"]:
+                print(f"    - {miss}")
+
+
+if __name__ == "__main__":
+    main()
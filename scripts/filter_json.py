@@ -1,26 +1,69 @@
 # scripts/filter_json.py
 # -*- coding: utf-8 -*-
-import json
+import gzip
+import hashlib
+import heapq
+import os
 import re
+import time
 import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 import requests
 from difflib import SequenceMatcher
 
+from json_io import dumps, loads, read_json, write_bytes_atomic, write_json
+from recorder import record_payload
+
+try:
+    import brotli  # اختياري: إذا مو منصّب نكتفي بـ gzip
+except ImportError:
+    brotli = None
+
+try:
+    from rapidfuzz import fuzz  # اختياري: محرك المطابقة السريع
+except ImportError:
+    fuzz = None
+
 # ========= إعدادات =========
 REPO_ROOT = Path(__file__).resolve().parents[1]
 MATCHES_DIR = REPO_ROOT / "matches"
 OUTPUT_PATH = MATCHES_DIR / "filtered_matches.json"
 LIVEONSAT_PATH = MATCHES_DIR / "liveonsat_raw.json"
 
+# نسخ خفيفة للعملاء (موبايل): minified + مضغوط + delta مقابل التشغيل السابق
+COMPACT_PATH = MATCHES_DIR / "filtered_matches.min.json"
+COMPACT_GZ_PATH = MATCHES_DIR / "filtered_matches.min.json.gz"
+COMPACT_BR_PATH = MATCHES_DIR / "filtered_matches.min.json.br"
+DELTA_PATH = MATCHES_DIR / "filtered_matches.delta.json"
+MANIFEST_PATH = MATCHES_DIR / "filtered_matches.manifest.json"
+
+# حالة المطابقة من التشغيل السابق (إعادة مطابقة تدريجية: بس اللي تغيّر ينحسب)
+MATCH_STATE_PATH = MATCHES_DIR / "match_state.json"
+MATCH_STATE_VERSION = 2
+
+# حقول Debug ما تروح للنسخة المختصرة ولا تدخل بالمقارنة
+COMPACT_DROP_FIELDS = ("merge_debug",)
+
+# الشعارات بالنسخة المختصرة: خريطة فريق -> شعار بدل URL كامل بكل مباراة
+LOGO_FIELDS = (("home_team", "home_logo"), ("away_team", "away_logo"))
+
 YALLASHOOT_URL = "https://raw.githubusercontent.com/a7shk1/yallashoot/refs/heads/main/matches/today.json"
 
+# محرك المطابقة (MATCHER_ENGINES): reference | bnb | rapidfuzz
+DEFAULT_MATCHER_ENGINE = "bnb"
+
 # نافذة التطابق بالوقت (دقائق) — الأساسية
 TIME_TOL_MIN = 25
 
 # offsets محتملة (إذا liveonsat وقتها مو بغداد)
 TIME_OFFSETS = [0, 60, 120, 180, -60, -120, -180]
 
+# معايرة الـ offset مرة وحدة لكل تشغيل (من مباريات مؤكدة: beIN مشترك / اسم فريق مطابق)
+CALIB_MIN_ANCHORS = 2     # أقل عدد أصوات حتى نثق بالـ offset
+CALIB_MIN_SHARE = 0.6     # نسبة الأصوات للـ offset الغالب
+
 # ========= أدوات مساعدة =========
 EMOJI_MISC_RE = re.compile(r'[\u2600-\u27BF\U0001F300-\U0001FAFF]+')
 BEIN_EN_RE = re.compile(r'bein\s*sports?', re.I)
@@ -55,15 +98,19 @@ def kickoff_to_minutes(hhmm: str):
 def wrap_minutes(x: int) -> int:
     return x % 1440
 
-def best_time_diff_with_offsets(y_tmin: int, live_tmin: int) -> tuple[int, int]:
+def time_diff_with_offset(y_tmin: int, live_tmin: int, off: int) -> int:
+    d = abs(wrap_minutes(y_tmin) - wrap_minutes(live_tmin + off))
+    # خذ الأقصر عبر منتصف الليل
+    return min(d, 1440 - d)
+
+def best_time_diff_with_offsets(y_tmin: int, live_tmin: int, offsets=TIME_OFFSETS) -> tuple[int, int]:
     """
     يرجّع (أفضل فرق بالدقائق, offset المستخدم)
+    offsets: قائمة الـ offsets المسموحة (بعد المعايرة تكون offset واحد فقط)
     """
     best = (10**9, 0)
-    for off in TIME_OFFSETS:
-        d = abs(wrap_minutes(y_tmin) - wrap_minutes(live_tmin + off))
-        # خذ الأقصر عبر منتصف الليل
-        d = min(d, 1440 - d)
+    for off in offsets:
+        d = time_diff_with_offset(y_tmin, live_tmin, off)
         if d < best[0]:
             best = (d, off)
     return best
@@ -312,6 +359,22 @@ def comp_bucket(name: str) -> str:
         return "MAR-BOT"
     return "OTHER"
 
+COMP_TOPIC_PREFIX = "comp_"
+
+def competition_topic(name: str) -> str:
+    """
+    FCM topic لكل بطولة (أحرف مسموحة فقط: a-z0-9-_):
+    bucket معروف -> comp_uefa-cl ، غيره -> comp_<hash> للاسم المطبّع بدون المرحلة
+    ("أوروبا, دوري أبطال اوروبا - نصف النهائي" و "... - النهائي" نفس الـ topic).
+    """
+    bucket = comp_bucket(name)
+    if bucket != "OTHER":
+        return COMP_TOPIC_PREFIX + bucket.lower()
+    base = normalize_text((name or "").split(" - ")[0])
+    if not base:
+        return COMP_TOPIC_PREFIX + "other"
+    return COMP_TOPIC_PREFIX + hashlib.sha1(base.encode("utf-8")).hexdigest()[:10]
+
 def split_title_teams(title: str):
     """
     من liveonsat: "A v B" أو "A vs B" -> (home, away)
@@ -324,27 +387,40 @@ def split_title_teams(title: str):
     return ("", "")
 
 # ========= قراءة liveonsat إلى فهرس =========
-def build_live_index(live_data: dict):
-    idx = []
-    matches = (live_data or {}).get("matches", []) or []
-    for m in matches:
-        # time
-        t = (m.get("kickoff_baghdad") or m.get("time_baghdad") or m.get("kickoff") or "").strip()
-        tmin = kickoff_to_minutes(t)
-        if tmin is None:
-            continue
+LIVE_CHANNEL_KEYS = ("channels_raw", "channels", "tv_channels", "broadcasters", "broadcaster")
+
+def row_fingerprint(m: dict, source: str = "liveonsat") -> str:
+    """بصمة الصف الخام (المصدر + محتواه) — تنحسب بدون live_record حتى نعرف شنو تغيّر بين التشغيلات."""
+    return hashlib.sha1(source.encode("utf-8") + b"|" + dumps(m, pretty=False)).hexdigest()[:12]
+
+def live_record(m: dict, raw_channels: list | None = None, source: str = "liveonsat"):
+    """
+    صف واحد من أي مصدر قوائم -> سجل الفهرس (نفس شكل build_live_index) أو None إذا ماكو وقت.
+    raw_channels: إذا المصدر عنده مفاتيح قنوات خاصة (يلا) — وإلا نقرأ LIVE_CHANNEL_KEYS.
+    """
+    # time
+    t = (m.get("kickoff_baghdad") or m.get("time_baghdad") or m.get("kickoff") or "").strip()
+    tmin = kickoff_to_minutes(t)
+    if tmin is None:
+        return None
 
-        # comp + bucket
-        comp = (m.get("competition") or "").strip()
-        bucket = comp_bucket(comp)
+    # comp + bucket
+    comp = (m.get("competition") or "").strip()
+    bucket = comp_bucket(comp)
 
-        # teams from title
-        title = (m.get("title") or m.get("match") or m.get("name") or "").strip()
-        lh, la = split_title_teams(title)
+    # teams from title (أو home/away إذا المصدر يعطيها منفصلة)
+    title = (m.get("title") or m.get("match") or m.get("name") or "").strip()
+    lh, la = split_title_teams(title)
+    if not title:
+        lh = (m.get("home") or m.get("home_team") or "").strip()
+        la = (m.get("away") or m.get("away_team") or "").strip()
+        if lh and la:
+            title = f"{lh} v {la}"
 
-        # channels
+    # channels
+    if raw_channels is None:
         raw_channels = []
-        for ck in ("channels_raw", "channels", "tv_channels", "broadcasters", "broadcaster"):
+        for ck in LIVE_CHANNEL_KEYS:
             if ck in m and m[ck]:
                 raw = m[ck]
                 if isinstance(raw, list):
@@ -352,36 +428,65 @@ def build_live_index(live_data: dict):
                 elif isinstance(raw, str):
                     raw_channels.extend(to_list_channels(raw))
 
-        bein_nums = set()
-        allowed = []
-        for ch in raw_channels:
-            disp = clean_channel_display(ch)
-            if not disp:
-                continue
-
-            sig = extract_bein_signal(disp)
-            if sig["is_bein"]:
-                if sig["num"]:
-                    bein_nums.add(sig["num"])
-                continue
+    bein_nums = set()
+    allowed = []
+    for ch in raw_channels:
+        disp = clean_channel_display(ch)
+        if not disp:
+            continue
 
-            if is_supported_channel(disp):
-                allowed.append(disp)
+        sig = extract_bein_signal(disp)
+        if sig["is_bein"]:
+            if sig["num"]:
+                bein_nums.add(sig["num"])
+            continue
 
-        allowed = dedupe_channels_preserve_order(allowed)
+        if is_supported_channel(disp):
+            allowed.append(disp)
+
+    allowed = dedupe_channels_preserve_order(allowed)
+
+    # id ثابت للصف عبر التشغيلات + بصمة محتواه (لإعادة المطابقة التدريجية)
+    lid = hashlib.sha1(f"{source}|{title}|{t}|{comp}".encode("utf-8")).hexdigest()[:12]
+
+    return {
+        "lid": lid,
+        "fp": row_fingerprint(m, source),
+        "tmin": tmin,
+        "bucket": bucket,
+        "bein_nums": bein_nums,
+        "allowed": allowed,
+        "home": lh,
+        "away": la,
+        "title": title,
+        "home_n": normalize_text(lh),
+        "away_n": normalize_text(la),
+        "source": source,
+    }
 
-        idx.append({
-            "tmin": tmin,
-            "bucket": bucket,
-            "bein_nums": bein_nums,
-            "allowed": allowed,
-            "home": lh,
-            "away": la,
-            "home_n": normalize_text(lh),
-            "away_n": normalize_text(la),
-        })
+def build_live_index(live_data: dict, source: str = "liveonsat", cache: dict | None = None):
+    """
+    cache (اختياري): fp -> سجل من التشغيل السابق (match_state.json "rows").
+    الصف اللي بصمته موجودة ما يمر على live_record (تنظيف القنوات هو الغالي).
+    """
+    idx = []
+    matches = (live_data or {}).get("matches", []) or []
+    for m in matches:
+        cached = cache.get(row_fingerprint(m, source)) if cache else None
+        rec = restore_live_record(cached) if cached else live_record(m, source=source)
+        if rec is not None:
+            idx.append(rec)
     return idx
 
+def stored_live_record(rec: dict) -> dict:
+    """سجل الفهرس -> شكل قابل للـ JSON (بدون seq، والوقت قبل تحويل المعايرة)."""
+    out = {k: v for k, v in rec.items() if k not in ("seq", "site_offset", "offsets")}
+    out["bein_nums"] = sorted(rec.get("bein_nums", ()))
+    return out
+
+def restore_live_record(stored: dict) -> dict:
+    return dict(stored, bein_nums=set(stored.get("bein_nums", ())))
+
 # ========= قنوات يلا =========
 def collect_yalla_channels(y: dict):
     keys = ["channels_raw","channels","tv_channels","channel","channel_ar","channel_en","broadcasters","broadcaster"]
@@ -403,24 +508,76 @@ def yalla_bein_num(y: dict):
             return sig["num"]
     return None
 
-def score_live_candidate(li: dict, y_home: str, y_away: str, y_tmin: int, y_bein: int | None, y_bucket: str):
+# ========= معايرة الـ offset =========
+def anchor_maps(live_idx: list[dict]):
+    """فهارس الـ anchors مرة وحدة: رقم beIN -> صفوف ، اسم فريق مطبّع -> صفوف."""
+    by_bein, by_name = {}, {}
+    for li in live_idx:
+        for num in li.get("bein_nums", ()):
+            by_bein.setdefault(num, []).append(li)
+        for name in {li.get("home_n", ""), li.get("away_n", "")} - {""}:
+            by_name.setdefault(name, []).append(li)
+    return by_bein, by_name
+
+def infer_site_offset(y_matches: list[dict], live_idx: list[dict]):
     """
-    سكورنغ: فرق + وقت + bein + bucket + غنى القنوات
+    يستنتج offset الموقع الغالب مرة وحدة لكل تشغيل.
+    كل مباراة يلا عندها anchors (beIN مشترك أو اسم فريق مطابق) تصوّت للـ offset
+    اللي يقرّب الوقت ضمن TIME_TOL_MIN — بس إذا كان الـ offset واحد بدون لبس.
+    الـ anchors تنجاب من anchor_maps (lookup) بدل المرور على كل زوج يلا × live.
+    يرجّع (offsets للاستخدام, معلومات المعايرة). إذا الثقة قليلة يرجع TIME_OFFSETS كاملة.
+    """
+    by_bein, by_name = anchor_maps(live_idx)
+    votes = {}
+    for m in y_matches:
+        y_tmin = kickoff_to_minutes((m.get("kickoff_baghdad") or m.get("time_baghdad") or m.get("kickoff") or "").strip())
+        if y_tmin is None:
+            continue
+        y_bein = yalla_bein_num(m)
+        y_names = {
+            normalize_text((m.get("home") or m.get("home_team") or "").strip()),
+            normalize_text((m.get("away") or m.get("away_team") or "").strip()),
+        } - {""}
+
+        anchors = {id(li): li for li in by_bein.get(y_bein, ())}
+        for name in y_names:
+            anchors.update((id(li), li) for li in by_name.get(name, ()))
+
+        fits = set()
+        for li in anchors.values():
+            dmin, off = best_time_diff_with_offsets(y_tmin, li["tmin"])
+            if dmin <= TIME_TOL_MIN:
+                fits.add(off)
+
+        # مباراة تدعم أكثر من offset = لبس (مثلاً beIN 1 لعدة مباريات) → ما تصوّت
+        if len(fits) == 1:
+            off = fits.pop()
+            votes[off] = votes.get(off, 0) + 1
+
+    total = sum(votes.values())
+    info = {"votes": votes, "anchors": total, "offset": None}
+    if not total:
+        return TIME_OFFSETS, info
+
+    top_off, top_votes = max(votes.items(), key=lambda kv: kv[1])
+    if top_votes >= CALIB_MIN_ANCHORS and top_votes / total >= CALIB_MIN_SHARE:
+        info["offset"] = top_off
+        return [top_off], info
+    return TIME_OFFSETS, info
+
+# أعلى نقاط ممكنة من تشابه الفرق (int(best_team * 60))
+TEAM_SCORE_MAX = 60
+
+def cheap_score_parts(li: dict, y_tmin: int, y_bein: int | None, y_bucket: str, offsets=TIME_OFFSETS):
+    """
+    الأجزاء الرخيصة من السكور (بدون تشابه نصوص): وقت + bein + bucket + غنى القنوات
+    li["offsets"] (إذا موجود، من calibrate_source) يغلب على offsets.
+    يرجّع (score, dmin, offset)
     """
     score = 0
-    # teams similarity
-    sh = similarity(li.get("home", ""), y_home)
-    sa = similarity(li.get("away", ""), y_away)
-
-    # اسماء الفرق بالعكس (أحياناً ترتيب)
-    sh_rev = similarity(li.get("home", ""), y_away)
-    sa_rev = similarity(li.get("away", ""), y_home)
-
-    best_team = max((sh + sa) / 2, (sh_rev + sa_rev) / 2)
-    score += int(best_team * 60)  # up to 60
 
     # time diff with offsets
-    dmin, used_off = best_time_diff_with_offsets(y_tmin, li["tmin"])
+    dmin, used_off = best_time_diff_with_offsets(y_tmin, li["tmin"], li.get("offsets") or offsets)
     if dmin <= TIME_TOL_MIN:
         score += 35
     elif dmin <= 60:
@@ -439,75 +596,645 @@ def score_live_candidate(li: dict, y_home: str, y_away: str, y_tmin: int, y_bein
     # allowed channels richness
     score += min(len(li.get("allowed", [])), 6)
 
+    return score, dmin, used_off
+
+def team_similarity(li: dict, y_home: str, y_away: str) -> float:
+    """أفضل تشابه للفرق (بالترتيب أو بالعكس) — الجزء الغالي من السكور."""
+    sh = similarity(li.get("home", ""), y_home)
+    sa = similarity(li.get("away", ""), y_away)
+
+    # اسماء الفرق بالعكس (أحياناً ترتيب)
+    sh_rev = similarity(li.get("home", ""), y_away)
+    sa_rev = similarity(li.get("away", ""), y_home)
+
+    return max((sh + sa) / 2, (sh_rev + sa_rev) / 2)
+
+def quick_similarity_bound(a_n: str, b_n: str) -> float:
+    """حد أعلى رخيص لـ similarity() على نصوص مطبّعة مسبقاً (quick_ratio >= ratio)."""
+    if not a_n or not b_n:
+        return 0.0
+    if a_n == b_n:
+        return 1.0
+    return SequenceMatcher(None, a_n, b_n).quick_ratio()
+
+def team_similarity_bound(li: dict, y_home_n: str, y_away_n: str) -> float:
+    """حد أعلى لـ team_similarity() بدون ratio الكامل."""
+    h, a = li.get("home_n", ""), li.get("away_n", "")
+    fwd = (quick_similarity_bound(h, y_home_n) + quick_similarity_bound(a, y_away_n)) / 2
+    rev = (quick_similarity_bound(h, y_away_n) + quick_similarity_bound(a, y_home_n)) / 2
+    return max(fwd, rev)
+
+def score_live_candidate(li: dict, y_home: str, y_away: str, y_tmin: int, y_bein: int | None, y_bucket: str,
+                         offsets=TIME_OFFSETS):
+    """
+    سكورنغ: فرق + وقت + bein + bucket + غنى القنوات
+    """
+    cheap, dmin, used_off = cheap_score_parts(li, y_tmin, y_bein, y_bucket, offsets)
+    best_team = team_similarity(li, y_home, y_away)
+    score = int(best_team * TEAM_SCORE_MAX) + cheap  # teams up to 60
+
     return score, dmin, used_off, best_team
 
-def pick_best_live(li_list: list[dict], y_home: str, y_away: str, y_tmin: int, y_bein: int | None, y_bucket: str):
+def pick_best_live(li_list: list[dict], y_home: str, y_away: str, y_tmin: int, y_bein: int | None, y_bucket: str,
+                   offsets=TIME_OFFSETS, stats: dict | None = None, team_sim_fn=team_similarity):
+    """
+    branch-and-bound: نحسب الأجزاء الرخيصة أولاً ونرتب حسب الحد الأعلى (cheap + 60)،
+    بعدها نضيّق الحد بـ quick_ratio، وأي مرشح ما يقدر يتجاوز الأفضل الحالي
+    ما نحسب له تشابه النصوص الكامل.
+    النتيجة نفس الحلقة البسيطة بالضبط: أعلى سكور، وعند التعادل أول مرشح (seq أو ترتيب القائمة).
+    stats (اختياري): يتجمع فيه عدد المرشحين المحسوبين/المقصوصين.
+    team_sim_fn: دالة تشابه الفرق (لازم تكون <= quick_ratio حتى يبقى القص صحيح).
+    """
+    cands = []
+    for i, li in enumerate(li_list):
+        cheap, dmin, off = cheap_score_parts(li, y_tmin, y_bein, y_bucket, offsets)
+        cands.append((cheap + TEAM_SCORE_MAX, li.get("seq", i), cheap, dmin, off, li))
+    # ترتيب تنازلي بالحد الأعلى، وعند التساوي بالترتيب الأصلي
+    cands.sort(key=lambda c: (-c[0], c[1]))
+    y_home_n, y_away_n = normalize_text(y_home), normalize_text(y_away)
+
+    def cannot_win(bound, i):
+        # أحسن حالة أقل من الأفضل، أو تعادل والتعادل يروح للأسبق
+        return bound < best_meta["score"] or (bound == best_meta["score"] and i > best_i)
+
     best = None
     best_meta = None
-    for li in li_list:
-        sc, dmin, off, team_sim = score_live_candidate(li, y_home, y_away, y_tmin, y_bein, y_bucket)
-        if best is None or sc > best_meta["score"]:
+    best_i = None
+    scored = pruned = 0
+    for pos, (ub, i, cheap, dmin, off, li) in enumerate(cands):
+        if best is not None:
+            if ub < best_meta["score"]:
+                # الباقي كله حدّه الأعلى أقل → ما أحد يفوز
+                pruned += len(cands) - pos
+                break
+            if cannot_win(ub, i):
+                pruned += 1
+                continue
+            if cannot_win(cheap + int(team_similarity_bound(li, y_home_n, y_away_n) * TEAM_SCORE_MAX), i):
+                pruned += 1
+                continue
+        team_sim = team_sim_fn(li, y_home, y_away)
+        sc = int(team_sim * TEAM_SCORE_MAX) + cheap
+        scored += 1
+        if best is None or sc > best_meta["score"] or (sc == best_meta["score"] and i < best_i):
             best = li
+            best_i = i
             best_meta = {"score": sc, "dmin": dmin, "offset": off, "team_sim": team_sim}
+
+    if stats is not None:
+        stats["scored"] = stats.get("scored", 0) + scored
+        stats["pruned"] = stats.get("pruned", 0) + pruned
     return best, best_meta
 
-# ========= الرئيسي =========
-def filter_matches():
-    # 1) يلا شوت
+# ========= محركات المطابقة =========
+# كل محرك: (li_list, y_home, y_away, y_tmin, y_bein, y_bucket, offsets, stats) -> (best, meta)
+def pick_best_live_reference(li_list: list[dict], y_home: str, y_away: str, y_tmin: int, y_bein: int | None,
+                             y_bucket: str, offsets=TIME_OFFSETS, stats: dict | None = None):
+    """المحرك المرجعي: يحسب score_live_candidate الكامل لكل مرشح (بدون قص)."""
+    best = None
+    best_meta = None
+    best_seq = None
+    for i, li in enumerate(li_list):
+        sc, dmin, off, team_sim = score_live_candidate(li, y_home, y_away, y_tmin, y_bein, y_bucket, offsets)
+        seq = li.get("seq", i)
+        if best is None or sc > best_meta["score"] or (sc == best_meta["score"] and seq < best_seq):
+            best = li
+            best_seq = seq
+            best_meta = {"score": sc, "dmin": dmin, "offset": off, "team_sim": team_sim}
+    if stats is not None:
+        stats["scored"] = stats.get("scored", 0) + len(li_list)
+    return best, best_meta
+
+@lru_cache(maxsize=4096)
+def normalize_cached(text: str) -> str:
+    return normalize_text(text)
+
+def rapidfuzz_similarity(a_n: str, b_n: str) -> float:
+    if not a_n or not b_n:
+        return 0.0
+    if a_n == b_n:
+        return 1.0
+    return fuzz.ratio(a_n, b_n) / 100.0
+
+def team_similarity_rapidfuzz(li: dict, y_home: str, y_away: str) -> float:
+    """نفس team_similarity بس على أسماء مطبّعة مسبقاً + rapidfuzz (Indel ratio)."""
+    h, a = li.get("home_n", ""), li.get("away_n", "")
+    yh, ya = normalize_cached(y_home), normalize_cached(y_away)
+    fwd = (rapidfuzz_similarity(h, yh) + rapidfuzz_similarity(a, ya)) / 2
+    rev = (rapidfuzz_similarity(h, ya) + rapidfuzz_similarity(a, yh)) / 2
+    return max(fwd, rev)
+
+def pick_best_live_rapidfuzz(li_list: list[dict], y_home: str, y_away: str, y_tmin: int, y_bein: int | None,
+                             y_bucket: str, offsets=TIME_OFFSETS, stats: dict | None = None):
+    """branch-and-bound + rapidfuzz — أسرع، والنتيجة ممكن تختلف قليلاً عن المرجعي."""
+    return pick_best_live(li_list, y_home, y_away, y_tmin, y_bein, y_bucket, offsets, stats,
+                          team_sim_fn=team_similarity_rapidfuzz)
+
+MATCHER_ENGINES = {
+    "reference": pick_best_live_reference,
+    "bnb": pick_best_live,
+}
+if fuzz is not None:
+    MATCHER_ENGINES["rapidfuzz"] = pick_best_live_rapidfuzz
+
+def get_matcher_engine(name: str | None = None):
+    """يرجّع (اسم, دالة) المحرك — من الاسم أو MATCHER_ENGINE أو الافتراضي."""
+    name = (name or os.environ.get("MATCHER_ENGINE") or DEFAULT_MATCHER_ENGINE).strip().lower()
+    if name not in MATCHER_ENGINES:
+        print(f"[!] WARN unknown matcher engine '{name}' — using '{DEFAULT_MATCHER_ENGINE}'")
+        name = DEFAULT_MATCHER_ENGINE
+    return name, MATCHER_ENGINES[name]
+
+def yalla_fields(m: dict) -> dict:
+    """الحقول اللي تحتاجها المطابقة من مباراة يلا."""
+    y_time = (m.get("kickoff_baghdad") or m.get("time_baghdad") or m.get("kickoff") or "").strip()
+    return {
+        "time": y_time,
+        "tmin": kickoff_to_minutes(y_time),
+        "bucket": comp_bucket(m.get("competition") or ""),
+        "bein": yalla_bein_num(m),
+        "home": (m.get("home") or m.get("home_team") or "").strip(),
+        "away": (m.get("away") or m.get("away_team") or "").strip(),
+    }
+
+def broad_candidates(y_tmin: int | None, live_idx: list[dict], offsets=TIME_OFFSETS) -> list[dict]:
+    """
+    بدل فلترة 25 دقيقة فقط: خذ كل المرشحين ضمن 3 ساعات (لأن offsets ممكن).
+    offsets لكل سجل من li["offsets"] إذا موجود (صفوف مصدر معاير = [0]).
+    """
+    if y_tmin is None:
+        return []
+    broad = []
+    for li in live_idx:
+        dmin, _ = best_time_diff_with_offsets(y_tmin, li["tmin"], li.get("offsets") or offsets)
+        if dmin <= 180:
+            broad.append(li)
+    return broad
+
+def match_yalla_to_live(m: dict, live_idx: list[dict], offsets=TIME_OFFSETS, engine=pick_best_live,
+                        stats: dict | None = None):
+    """أفضل صف liveonsat لمباراة يلا وحدة (أو (None, None))."""
+    yf = yalla_fields(m)
+    if yf["tmin"] is None or not live_idx:
+        return None, None
+    broad = broad_candidates(yf["tmin"], live_idx, offsets)
+    return engine(broad, yf["home"], yf["away"], yf["tmin"], yf["bein"], yf["bucket"], offsets, stats)
+
+# ========= إعادة المطابقة التدريجية =========
+def fixture_signature(m: dict, yf: dict) -> str:
+    """
+    بصمة حقول مباراة يلا اللي تأثر على المطابقة: الفرق/الوقت/البطولة/قنوات يلا.
+    status_text / result_text مو داخلة — تغيّرها ما يعيد المطابقة.
+    """
+    parts = [yf["time"], yf["home"], yf["away"], m.get("competition") or "", yf["bein"], collect_yalla_channels(m)]
+    return hashlib.sha1(dumps(parts, pretty=False)).hexdigest()[:16]
+
+def load_match_state(date_str: str) -> dict:
+    """
+    حالة التشغيل السابق (فارغة إذا يوم جديد أو نسخة مختلفة):
+      context     -> المحرك + offsets + (مصدر, offset) — إذا تغيّر، كل المباريات تنحسب من جديد
+      calibration -> اسم المصدر -> {"key", "offset"}
+      rows        -> fp -> سجل الفهرس (قبل المعايرة)
+      fixtures    -> match_id -> {"sig", "best" (fp), "meta"}
+    """
+    try:
+        state = read_json(MATCH_STATE_PATH)
+    except Exception:
+        return {}
+    if state.get("version") != MATCH_STATE_VERSION or state.get("date") != date_str:
+        return {}
+    return state
+
+def save_match_state(date_str: str, state: dict):
     try:
-        yresp = requests.get(YALLASHOOT_URL, timeout=25)
-        yresp.raise_for_status()
-        yalla = yresp.json()
+        write_json(MATCH_STATE_PATH, dict(state, version=MATCH_STATE_VERSION, date=date_str), pretty=False)
     except Exception as e:
-        print(f"[x] ERROR fetching yallashoot: {e}")
-        return
+        print(f"[!] WARN writing match state: {e}")
+
+# ========= نسخ العملاء (compact / gzip / brotli / delta) =========
+def match_id(date_str: str, m: dict) -> str:
+    """
+    id ثابت للمباراة عبر التشغيلات: التاريخ + الفريقين + البطولة.
+    (الوقت والحالة والنتيجة والقنوات تتغير → تظهر كـ changed مو كمباراة جديدة)
+    """
+    parts = [date_str or "", m.get("home_team") or "", m.get("away_team") or "", m.get("competition") or ""]
+    raw = "|".join(str(x).strip().lower() for x in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+
+def team_logos(matches: list[dict]) -> dict:
+    """فريق -> URL الشعار (أول ظهور)."""
+    logos = {}
+    for m in matches:
+        for team_f, logo_f in LOGO_FIELDS:
+            if m.get(team_f) and m.get(logo_f):
+                logos.setdefault(m[team_f], m[logo_f])
+    return logos
+
+def compact_match(m: dict, logos: dict | None = None) -> dict:
+    """
+    بدون COMPACT_DROP_FIELDS. إذا انطت logos: حقل الشعار ينشال إذا فارغ أو نفس خريطة الفريق
+    (يبقى بالمباراة بس إذا نفس الفريق عنده شعارين مختلفين باليوم).
+    """
+    out = {k: v for k, v in m.items() if k not in COMPACT_DROP_FIELDS}
+    if logos is not None:
+        for team_f, logo_f in LOGO_FIELDS:
+            if logo_f in out and (not out[logo_f] or logos.get(m.get(team_f)) == out[logo_f]):
+                del out[logo_f]
+    return out
+
+def compact_payload(date_str, matches: list[dict]) -> dict:
+    """
+    النسخة المختصرة للعملاء: الشعارات بخريطة وحدة لكل فريق بدل URL كامل مكرر بكل مباراة،
+    والبادئة المشتركة (logo_base) تنكتب مرة وحدة:  URL = logo_base + logos[home_team]
+    """
+    logos = team_logos(matches)
+    base = os.path.commonprefix(list(logos.values())) if len(logos) > 1 else ""
+    base = base[:base.rfind("/") + 1]
+    return {
+        "date": date_str,
+        "logo_base": base,
+        "logos": {team: url[len(base):] for team, url in logos.items()},
+        "matches": [compact_match(m, logos) for m in matches],
+    }
+
+def dumps_compact(data) -> bytes:
+    return dumps(data, pretty=False)
+
+def index_by_match_id(data: dict, logos: dict | None = None) -> dict:
+    date_str = (data or {}).get("date") or ""
+    out = {}
+    for m in (data or {}).get("matches", []) or []:
+        mid = m.get("match_id") or match_id(date_str, m)
+        out[mid] = compact_match(m, logos)
+    return out
+
+def build_delta(prev: dict | None, cur: dict, prev_hash: str | None, cur_hash: str) -> dict:
+    """
+    delta بين التشغيل السابق والحالي (مفتاح: match_id)، بنفس شكل النسخة المختصرة:
+      added   -> مباريات كاملة جديدة
+      removed -> ids انحذفت
+      changed -> فقط الحقول اللي تغيّرت (+ removed_fields: حقول انشالت من المباراة، مثل شعار
+                 كان inline وصار من خريطة logos)
+      logos   -> فريق -> URL كامل للشعارات الجديدة/المتغيّرة
+    """
+    prev_logos = team_logos((prev or {}).get("matches", []) or [])
+    cur_logos = team_logos(cur.get("matches", []) or [])
+    prev_idx = index_by_match_id(prev, prev_logos) if prev else {}
+    cur_idx = index_by_match_id(cur, cur_logos)
+
+    added = [cur_idx[k] for k in cur_idx if k not in prev_idx]
+    removed = [k for k in prev_idx if k not in cur_idx]
+    changed = []
+    for k, m in cur_idx.items():
+        old = prev_idx.get(k)
+        if old is None:
+            continue
+        fields = {f: v for f, v in m.items() if f not in old or old[f] != v}
+        gone = [f for f in old if f not in m]
+        if fields or gone:
+            entry = {"match_id": k, "fields": fields}
+            if gone:
+                entry["removed_fields"] = gone
+            changed.append(entry)
+
+    return {
+        "date": cur.get("date"),
+        "from_hash": prev_hash,
+        "to_hash": cur_hash,
+        # إذا تغيّر اليوم أو ماكو تشغيل سابق، العميل لازم ياخذ النسخة الكاملة
+        "full_refresh": prev is None or (prev.get("date") != cur.get("date")),
+        "added": added,
+        "removed": removed,
+        "changed": changed,
+        "logos": {team: url for team, url in cur_logos.items() if prev_logos.get(team) != url},
+    }
+
+def read_previous_output():
+    try:
+        return read_json(OUTPUT_PATH)
+    except Exception:
+        return None
+
+def write_client_variants(output: dict, previous: dict | None):
+    """يكتب minified + gzip (+ brotli إذا متوفر) + delta + manifest فيه الـ hash."""
+    body = dumps_compact(compact_payload(output.get("date"), output.get("matches", [])))
+    cur_hash = hashlib.sha256(body).hexdigest()
+
+    prev_hash = None
+    if previous is not None:
+        prev_body = dumps_compact(compact_payload(previous.get("date"), previous.get("matches", []) or []))
+        prev_hash = hashlib.sha256(prev_body).hexdigest()
+
+    # نفس المحتوى والملفات موجودة → ما نعيد الضغط (brotli quality=11 هو أغلى خطوة بالتشغيل)
+    paths = [COMPACT_PATH, COMPACT_GZ_PATH] + ([COMPACT_BR_PATH] if brotli is not None else [])
+    unchanged = cur_hash == prev_hash and all(p.exists() for p in paths)
+    if not unchanged:
+        write_bytes_atomic(COMPACT_PATH, body)
+        # mtime=0 حتى يكون الملف المضغوط ثابت لنفس المحتوى (ما يطلع diff بالـ git بلا سبب)
+        write_bytes_atomic(COMPACT_GZ_PATH, gzip.compress(body, compresslevel=9, mtime=0))
+    files = {
+        "compact": {"path": COMPACT_PATH.name, "bytes": len(body)},
+        "gzip": {"path": COMPACT_GZ_PATH.name, "bytes": COMPACT_GZ_PATH.stat().st_size},
+    }
+    if brotli is not None:
+        if not unchanged:
+            write_bytes_atomic(COMPACT_BR_PATH, brotli.compress(body, quality=11))
+        files["brotli"] = {"path": COMPACT_BR_PATH.name, "bytes": COMPACT_BR_PATH.stat().st_size}
+
+    # tick بدون تغيير: نخلي آخر delta حقيقي (A→B) بدل B→B فارغ — وإلا العميل اللي بعده على A
+    # ما يلگى delta يبدأ من hash مالته ويرجع ينزّل النسخة الكاملة
+    delta = None
+    if cur_hash == prev_hash:
+        try:
+            delta = read_json(DELTA_PATH)
+        except Exception:
+            delta = None
+        if not isinstance(delta, dict) or delta.get("to_hash") != cur_hash:
+            delta = None
+    if delta is None:
+        delta = build_delta(previous, output, prev_hash, cur_hash)
+        write_bytes_atomic(DELTA_PATH, dumps_compact(delta))
+    files["delta"] = {"path": DELTA_PATH.name, "bytes": DELTA_PATH.stat().st_size}
+
+    manifest = {"date": output.get("date"), "hash": cur_hash, "prev_hash": delta.get("from_hash"), "files": files}
+    write_json(MANIFEST_PATH, manifest)
+
+    print(f"[i] Client variants: compact={len(body)}B gzip={files['gzip']['bytes']}B"
+          f"{' brotli=' + str(files['brotli']['bytes']) + 'B' if 'brotli' in files else ''}"
+          f" | delta: +{len(delta['added'])} -{len(delta['removed'])} ~{len(delta['changed'])}")
+
+# ========= مصادر البيانات (plugins) =========
+def fetch_yallashoot():
+    yresp = requests.get(YALLASHOOT_URL, timeout=25)
+    yresp.raise_for_status()
+    # RECORD=1 → أرشفة الـ payload لإعادة التشغيل offline (replay.py)
+    record_payload("yallashoot", yresp.content, "json")
+    return loads(yresp.content)
+
+class ListingSource:
+    """
+    مصدر قوائم مباريات:
+      fetch()          -> payload خام (يُستدعى بـ thread منفصل، ممكن يرمي استثناء)
+      records(payload, cache) -> سجلات بشكل build_live_index (cache: سجلات التشغيل السابق بالـ fp)
+    primary=True: الـ payload هو المصدر الأساسي (يلا) وسجلاته ما تندمج بفهرس القنوات.
+    """
+    name = "source"
+    primary = False
+
+    def fetch(self) -> dict:
+        raise NotImplementedError
+
+    def records(self, payload: dict, cache: dict | None = None) -> list[dict]:
+        return build_live_index(payload, source=self.name, cache=cache)
+
+class YallashootSource(ListingSource):
+    name = "yallashoot"
+    primary = True
+
+    def fetch(self) -> dict:
+        return fetch_yallashoot()
+
+class LiveonsatFileSource(ListingSource):
+    """liveonsat_raw.json اللي يكتبه scrape_liveonsat_only.py (workflow منفصل)."""
+    name = "liveonsat"
+
+    def fetch(self) -> dict:
+        return read_json(LIVEONSAT_PATH)
+
+class LiveonsatScrapeSource(ListingSource):
+    """سحب liveonsat مباشرة بـ Playwright (LIVEONSAT_SCRAPE=1) بدل قراءة الملف."""
+    name = "liveonsat"
+
+    def fetch(self) -> dict:
+        from scrape_liveonsat_only import DEFAULT_URL, get_html_with_playwright, parse_liveonsat
+        url = os.environ.get("FORCE_URL") or os.environ.get("LOS_URL") or DEFAULT_URL
+        return {"matches": parse_liveonsat(get_html_with_playwright(url))}
+
+class JsonListingSource(ListingSource):
+    """أي URL يرجّع JSON بشكل liveonsat_raw.json: {"matches": [{competition,title,kickoff_baghdad,channels_raw}]}."""
+
+    def __init__(self, name: str, url: str, timeout: int = 25):
+        self.name = name
+        self.url = url
+        self.timeout = timeout
+
+    def fetch(self) -> dict:
+        resp = requests.get(self.url, timeout=self.timeout)
+        resp.raise_for_status()
+        record_payload(self.name, resp.content, "json")
+        return loads(resp.content)
+
+def default_sources() -> list[ListingSource]:
+    """
+    يلا (أساسي) + liveonsat + أي مصادر إضافية من LISTING_SOURCES:
+      LISTING_SOURCES="name1=https://...json,name2=https://...json"
+    الأسماء لازم تكون فريدة (الأرشيف والـ logs بالاسم) — المكرر يتجاهل مع تحذير.
+    """
+    sources = [YallashootSource()]
+    sources.append(LiveonsatScrapeSource() if os.environ.get("LIVEONSAT_SCRAPE") == "1" else LiveonsatFileSource())
+    names = {s.name for s in sources}
+    for item in (os.environ.get("LISTING_SOURCES") or "").split(","):
+        name, sep, url = item.strip().partition("=")
+        name, url = name.strip(), url.strip()
+        if not (sep and name and url):
+            continue
+        if name in names:
+            print(f"[!] WARN LISTING_SOURCES: duplicate source name '{name}' — skipped")
+            continue
+        names.add(name)
+        sources.append(JsonListingSource(name, url))
+    return sources
+
+def _fetch_timed(src: ListingSource):
+    t0 = time.perf_counter()
+    payload = src.fetch()
+    return payload, (time.perf_counter() - t0) * 1000
+
+def gather_sources(sources: list[ListingSource]) -> list:
+    """
+    يجلب كل المصادر بالتوازي (threads — الشغل كله I/O).
+    يرجّع payloads بنفس ترتيب sources. فشل أي مصدر ما يوقف الباقي: قيمته تصير None.
+    """
+    if not sources:
+        return []
+    payloads = []
+    with ThreadPoolExecutor(max_workers=len(sources)) as ex:
+        futures = [ex.submit(_fetch_timed, src) for src in sources]
+        for src, fut in zip(sources, futures):
+            try:
+                payload, ms = fut.result()
+                payloads.append(payload)
+                print(f"[i] Source {src.name}: fetched in {ms:.0f}ms")
+            except Exception as e:
+                print(f"[!] WARN source {src.name} failed: {e}")
+                payloads.append(None)
+    return payloads
+
+def calibrate_source(name: str, y_matches: list[dict], recs: list[dict], key: str = "",
+                     prev: dict | None = None) -> dict:
+    """
+    معايرة offset لكل مصدر لحاله (كل موقع ممكن بتوقيت مختلف)، وإذا واثقين نحوّل
+    أوقات صفوفه لتوقيت بغداد قبل الدمج (site_offset يبقى بالسجل للـ debug) ونثبّت
+    offsets = [0] عليها — حتى لو مصدر ثاني ما انعاير وانفتحت TIME_OFFSETS لصفوفه هو،
+    صفوف هذا المصدر ما تنزاح مرتين (site_offset + offset ثاني).
+    key: بصمة مدخلات المعايرة (صفوف المصدر + مباريات يلا)؛ إذا نفس prev["key"] ناخذ
+    الـ offset المحفوظ بدل infer_site_offset.
+    يرجّع {"key", "offset"} — offset None يعني صفوف المصدر بقت بتوقيت الموقع.
+    """
+    if prev and prev.get("key") == key:
+        off = prev.get("offset")
+    else:
+        _, calib = infer_site_offset(y_matches, recs)
+        off = calib["offset"]
+        if off is None:
+            print(f"[!] Source {name}: offset calibration low confidence (votes={calib['votes']})")
+        else:
+            print(f"[i] Source {name}: offset calibrated {off} (votes={calib['votes']})")
+    if off is not None:
+        for rec in recs:
+            rec["site_offset"] = off
+            rec["offsets"] = [0]
+            rec["tmin"] = wrap_minutes(rec["tmin"] + off)
+    return {"key": key, "offset": off}
+
+def merge_live_records(record_lists: list[list[dict]]) -> list[dict]:
+    """
+    k-way merge مرتب بوقت الانطلاق (عند التساوي: ترتيب المصادر ثم ترتيب الصفوف).
+    كل سجل ياخذ seq = (ترتيب المصدر, ترتيب الصف) — المحركات تكسر التعادل بيه،
+    فترتيب الدمج ما يغيّر أي مباراة تفوز.
+    """
+    for rank, recs in enumerate(record_lists):
+        for j, rec in enumerate(recs):
+            rec["seq"] = (rank, j)
+    return list(heapq.merge(*(sorted(recs, key=lambda r: r["tmin"]) for recs in record_lists),
+                            key=lambda r: r["tmin"]))
+
+# ========= الرئيسي =========
+
+def filter_matches(yalla: dict | None = None, live_data: dict | None = None, write: bool = True,
+                   engine: str | None = None):
+    """
+    yalla / live_data: إذا مُرّرت (replay) ما نجلب من الشبكة ولا نقرأ الملف.
+    write=False: ما نكتب أي ملف — بس نرجّع الـ output.
+    engine: اسم محرك المطابقة (افتراضياً MATCHER_ENGINE أو DEFAULT_MATCHER_ENGINE).
+    """
+    # 1+2) المصادر بالتوازي: يلا (أساسي) + liveonsat + أي مصادر إضافية
+    sources = default_sources()
+    if yalla is not None:
+        sources = [s for s in sources if not s.primary]
+    if live_data is not None:
+        # replay: بيانات liveonsat جاهزة
+        sources = [s for s in sources if s.primary]
+    payloads = gather_sources(sources)
+
+    if yalla is None:
+        yalla = next((p for s, p in zip(sources, payloads) if s.primary), None)
+        if yalla is None:
+            print("[x] ERROR fetching yallashoot")
+            return None
 
     y_matches = (yalla or {}).get("matches", []) or []
     print(f"[i] Yalla matches: {len(y_matches)}")
 
-    # 2) liveonsat (محلي)
-    try:
-        with LIVEONSAT_PATH.open("r", encoding="utf-8") as f:
-            live_data = json.load(f)
-    except Exception as e:
-        print(f"[!] WARN reading liveonsat: {e}")
-        live_data = {"matches": []}
+    # حالة التشغيل السابق: صفوف معالجة بالـ fp + المعايرة + نتيجة كل مباراة
+    date_str = (yalla or {}).get("date") or ""
+    state = load_match_state(date_str) if write else {}
+    row_cache = state.get("rows") or {}
 
-    live_matches = (live_data or {}).get("matches", []) or []
-    print(f"[i] Live matches in file: {len(live_matches)}")
+    named_records = []
+    if live_data is not None:
+        named_records.append(("liveonsat", build_live_index(live_data)))
+    for src, payload in zip(sources, payloads):
+        if src.primary or payload is None:
+            continue
+        try:
+            recs = src.records(payload, cache=row_cache)
+        except Exception as e:
+            print(f"[!] WARN normalizing source {src.name}: {e}")
+            continue
+        print(f"[i] Source {src.name}: {len((payload or {}).get('matches', []) or [])} rows, {len(recs)} usable (with time)")
+        named_records.append((src.name, recs))
+    new_rows = {rec["fp"]: stored_live_record(rec) for _, recs in named_records for rec in recs}
 
-    live_idx = build_live_index(live_data)
+    fixtures = []
+    for m in y_matches:
+        yf = yalla_fields(m)
+        mid = match_id(date_str, {"home_team": yf["home"], "away_team": yf["away"],
+                                  "competition": m.get("competition") or ""})
+        fixtures.append((m, yf, mid, fixture_signature(m, yf)))
+
+    # معايرة offset لكل مصدر مرة وحدة (بدل تجربة كل TIME_OFFSETS لكل زوج)، وتحويل
+    # أوقاته لبغداد قبل الدمج. المصدر اللي ما انعاير بس صفوفه تتجرب بكل TIME_OFFSETS.
+    # نفس صفوف المصدر + نفس مباريات يلا → نفس الـ offset المحفوظ بدون معايرة.
+    prev_calib = state.get("calibration") or {}
+    y_key = "|".join(sig for *_, sig in fixtures)
+    calibration = {}
+    for name, recs in named_records:
+        key = hashlib.sha1(f"{y_key}#{'|'.join(rec['fp'] for rec in recs)}".encode("utf-8")).hexdigest()[:16]
+        calibration[name] = calibrate_source(name, y_matches, recs, key, prev_calib.get(name))
+    calibrated = [c["offset"] is not None for c in calibration.values()]
+    offsets = [0] if calibrated and all(calibrated) else TIME_OFFSETS
+    if offsets != [0]:
+        print("[!] Offset calibration incomplete — trying all offsets for uncalibrated sources")
+
+    live_idx = merge_live_records([recs for _, recs in named_records])
     print(f"[i] Live index usable (with time): {len(live_idx)}")
 
     out_matches = []
     matched_from_live = 0
-
-    for m in y_matches:
-        y_time = (m.get("kickoff_baghdad") or m.get("time_baghdad") or m.get("kickoff") or "").strip()
-        y_tmin = kickoff_to_minutes(y_time)
-        y_bucket = comp_bucket(m.get("competition") or "")
-        y_bein = yalla_bein_num(m)
-
-        y_home = (m.get("home") or m.get("home_team") or "").strip()
-        y_away = (m.get("away") or m.get("away_team") or "").strip()
+    prune_stats = {"scored": 0, "pruned": 0}
+
+    engine_name, engine_fn = get_matcher_engine(engine)
+    print(f"[i] Matcher engine: {engine_name}")
+
+    # إعادة مطابقة تدريجية: نقارن الصفوف بالـ fp مع التشغيل السابق. المباراة تنحسب من جديد بس
+    # إذا تغيّرت حقولها أو انحذف/تغيّر أفضل صف إلها؛ إذا دخل نافذتها صف جديد نقارنه بأفضلها (patched).
+    context = {"engine": engine_name, "offsets": list(offsets),
+               "sources": [[name, c["offset"]] for name, c in calibration.items()]}
+    prev_fixtures = (state.get("fixtures") or {}) if state.get("context") == context else {}
+    live_by_fp = {}
+    for li in live_idx:
+        live_by_fp.setdefault(li["fp"], li)  # صفوف متطابقة: الأسبق (seq) هو اللي يفوز بالتعادل
+    added = [li for fp, li in live_by_fp.items() if fp not in row_cache]
+    # التعادل ينكسر بـ seq (ترتيب الصف)، فإذا تبدّل ترتيب الصفوف اللي ما تغيّرت (rows محفوظة
+    # بترتيب المصادر ثم الصفوف) صف خسر بالتعادل ممكن يصير قبل best ويفوز
+    reordered = [fp for fp in row_cache if fp in new_rows] != [fp for fp in new_rows if fp in row_cache]
+    new_fixtures = {}
+    reused = patched = rescored = 0
+
+    for m, yf, mid, sig in fixtures:
+        y_time, y_home, y_away = yf["time"], yf["home"], yf["away"]
 
         merged = []
         primary = yalla_primary_channel(m)
         if primary:
             merged.append(primary)
 
-        best = None
-        meta = None
-
-        if y_tmin is not None and live_idx:
-            # بدل فلترة 25 دقيقة فقط: خذ كل المرشحين ضمن 3 ساعات (لأن offsets ممكن)
-            broad = []
-            for li in live_idx:
-                dmin, _ = best_time_diff_with_offsets(y_tmin, li["tmin"])
-                if dmin <= 180:
-                    broad.append(li)
-
-            best, meta = pick_best_live(broad, y_home, y_away, y_tmin, y_bein, y_bucket)
+        prev = prev_fixtures.get(mid)
+        best = live_by_fp.get(prev.get("best")) if prev else None
+        same = bool(prev) and prev.get("sig") == sig and (prev.get("best") is None or best is not None)
+        window = broad_candidates(yf["tmin"], added, offsets) if same and added else []
+        if same and reordered and best is not None:
+            window += [li for li in broad_candidates(yf["tmin"], live_idx, offsets)
+                       if li["seq"] < best["seq"] and li["fp"] in row_cache]
+        if same and not window:
+            meta = prev.get("meta")
+            reused += 1
+        else:
+            if same:
+                # الصفوف اللي ما تغيّرت (وما صارت قبله) ما تفوز على best المحفوظ → نقارنه بس
+                # بالصفوف الجديدة بنافذته + اللي صارت قبله بالترتيب
+                cands = ([best] if best else []) + window
+                patched += 1
+            else:
+                cands = broad_candidates(yf["tmin"], live_idx, offsets) if live_idx else []
+                rescored += 1
+            best, meta = engine_fn(cands, y_home, y_away, yf["tmin"], yf["bein"], yf["bucket"], offsets, prune_stats) \
+                if cands else (None, None)
+            if meta and best.get("site_offset"):
+                # offset بالـ debug يبقى من وقت الموقع لبغداد (مو من الوقت بعد التحويل)
+                meta = dict(meta, offset=meta["offset"] + best["site_offset"])
+        new_fixtures[mid] = {"sig": sig, "best": best["fp"] if best else None, "meta": meta}
 
         if best and best.get("allowed"):
             merged.extend(best["allowed"])
@@ -516,7 +1243,9 @@ def filter_matches():
         merged = dedupe_channels_preserve_order(merged)
 
         out_matches.append({
+            "match_id": mid,
             "competition": m.get("competition") or "",
+            "comp_topic": competition_topic(m.get("competition") or ""),
             "kickoff_baghdad": y_time,
             "home_team": y_home,
             "away_team": y_away,
@@ -535,10 +1264,20 @@ def filter_matches():
         "matches": out_matches
     }
 
-    with OUTPUT_PATH.open("w", encoding="utf-8") as f:
-        json.dump(output, f, ensure_ascii=False, indent=2)
+    if write:
+        save_match_state(date_str, {"context": context, "calibration": calibration,
+                                    "rows": new_rows, "fixtures": new_fixtures})
+
+        previous = read_previous_output()
+
+        write_json(OUTPUT_PATH, output)
+
+        write_client_variants(output, previous)
 
+    print(f"[i] Incremental: reused {reused} | patched {patched} | rescored {rescored}")
+    print(f"[i] Candidates scored: {prune_stats['scored']} | pruned (branch-and-bound): {prune_stats['pruned']}")
     print(f"[✓] Done. yalla: {len(y_matches)} | matched_from_live: {matched_from_live} | written: {len(out_matches)}")
+    return output
 
 
 if __name__ == "__main__":
@@ -0,0 +1,85 @@
+# scripts/json_io.py
+# -*- coding: utf-8 -*-
+"""
+طبقة JSON مشتركة لكل السكربتات:
+- orjson إذا متوفر (أسرع بكثير بالـ load/dump)، وإلا json القياسي.
+  JSON_BACKEND=stdlib يجبر القياسي (للمقارنة/الـ benchmark).
+- المخرجات دائماً UTF-8 بدون escape للعربي (مثل ensure_ascii=False).
+- الكتابة ذرّية: ملف مؤقت بنفس المجلد ثم os.replace — القارئ (السيرفر/الـ workflow)
+  ما يشوف ملف نصّه مكتوب أبداً.
+"""
+import json
+import os
+import tempfile
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKENDS = ("orjson", "stdlib") if orjson is not None else ("stdlib",)
+
+# mkstemp ينشئ الملف 0600 و os.replace يحافظ عليه — نرجّع صلاحيات الملف العادية
+# (0666 & ~umask). الـ umask ينقرأ مرة وحدة هنا لأن os.umask مو آمن بين الـ threads.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+DEFAULT_FILE_MODE = 0o666 & ~_UMASK
+
+
+def active_backend() -> str:
+    forced = (os.environ.get("JSON_BACKEND") or "").strip().lower()
+    if forced in BACKENDS:
+        return forced
+    return BACKENDS[0]
+
+
+def loads(data, backend: str | None = None):
+    """bytes أو str -> object"""
+    if (backend or active_backend()) == "orjson":
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode("utf-8")
+    return json.loads(data)
+
+
+def dumps(obj, pretty: bool = True, backend: str | None = None) -> bytes:
+    """object -> bytes (UTF-8). pretty=True يعادل indent=2، وإلا minified."""
+    if (backend or active_backend()) == "orjson":
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def write_bytes_atomic(path: Path, payload: bytes):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode = path.stat().st_mode & 0o777  # ملف موجود: نحافظ على صلاحياته
+    except OSError:
+        mode = DEFAULT_FILE_MODE
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def read_json(path: Path):
+    """يقرأ ملف JSON (يرمي استثناء إذا مو موجود/مو صالح)."""
+    return loads(Path(path).read_bytes())
+
+
+def write_json(path: Path, data, pretty: bool = True):
+    """يكتب JSON بشكل ذرّي."""
+    write_bytes_atomic(path, dumps(data, pretty=pretty))
@@ -0,0 +1,98 @@
+# scripts/loadtest_serve.py
+# -*- coding: utf-8 -*-
+"""
+load test بسيط لـ serve_matches.py: يحاكي عملاء يسوون polling بـ If-None-Match.
+
+  python scripts/loadtest_serve.py --clients 500 --duration 20 --path /matches/compact
+
+كل عميل يحتفظ بآخر ETag ويرسله بالطلب التالي (مثل تطبيق الموبايل)،
+وبالنهاية يطبع req/s ونسب 200/304 و p50/p95/p99 للـ latency.
+"""
+import argparse
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_vals, p):
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, int(round(p / 100 * (len(sorted_vals) - 1))))
+    return sorted_vals[k]
+
+
+def client_loop(host, port, path, deadline, gzip_ok, think_s, results, lock):
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    etag = None
+    lat, codes, errors = [], {}, 0
+    while time.perf_counter() < deadline:
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if gzip_ok:
+            headers["Accept-Encoding"] = "gzip"
+        t0 = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            lat.append((time.perf_counter() - t0) * 1000)
+            codes[resp.status] = codes.get(resp.status, 0) + 1
+            etag = resp.getheader("ETag") or etag
+        except Exception:
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=10)
+        if think_s:
+            time.sleep(think_s)
+    conn.close()
+    with lock:
+        results["lat"].extend(lat)
+        results["errors"] += errors
+        for c, n in codes.items():
+            results["codes"][c] = results["codes"].get(c, 0) + n
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Polling load test for serve_matches.py")
+    ap.add_argument("--url", default="http://127.0.0.1:8080")
+    ap.add_argument("--path", default="/matches/compact")
+    ap.add_argument("--clients", type=int, default=200)
+    ap.add_argument("--duration", type=float, default=15.0)
+    ap.add_argument("--think", type=float, default=0.0, help="ثواني انتظار بين طلبات نفس العميل")
+    ap.add_argument("--no-gzip", action="store_true")
+    args = ap.parse_args()
+
+    u = urlsplit(args.url)
+    host, port = u.hostname or "127.0.0.1", u.port or 80
+
+    results = {"lat": [], "codes": {}, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+    threads = [
+        threading.Thread(
+            target=client_loop,
+            args=(host, port, args.path, deadline, not args.no_gzip, args.think, results, lock),
+            daemon=True,
+        )
+        for _ in range(args.clients)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    lat = sorted(results["lat"])
+    total = len(lat)
+    print(f"[i] {args.clients} clients × {args.duration:.0f}s on {args.path}")
+    print(f"[i] requests: {total} | {total / elapsed:.0f} req/s | errors: {results['errors']}")
+    print(f"[i] status: {dict(sorted(results['codes'].items()))}")
+    print(f"[i] latency ms: p50={percentile(lat, 50):.2f} p95={percentile(lat, 95):.2f} "
+          f"p99={percentile(lat, 99):.2f} max={lat[-1] if lat else 0:.2f}")
+
+
+if __name__ == "__main__":
+    main()
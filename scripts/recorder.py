@@ -0,0 +1,58 @@
+# scripts/recorder.py
+# -*- coding: utf-8 -*-
+"""
+أرشفة الصفحات/الـ payloads المجلوبة من الشبكة حتى نقدر نعيد تشغيلها offline (replay.py).
+
+التفعيل: RECORD=1  (المجلد: RECORD_DIR أو archive/ بجذر الريبو)
+الشكل:   archive/<kind>/<UTC timestamp>_<sha256[:12]>.<ext>
+"""
+import datetime as dt
+import hashlib
+import os
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_ARCHIVE_DIR = REPO_ROOT / "archive"
+
+TS_FORMAT = "%Y%m%dT%H%M%SZ"
+
+
+def archive_dir() -> Path:
+    return Path(os.environ.get("RECORD_DIR") or DEFAULT_ARCHIVE_DIR)
+
+
+def record_enabled() -> bool:
+    return os.environ.get("RECORD") == "1"
+
+
+def record_payload(kind: str, payload: bytes, ext: str):
+    """يحفظ payload إذا RECORD=1. يرجّع المسار أو None. ما يفشّل التشغيل أبداً."""
+    if not record_enabled():
+        return None
+    try:
+        ts = dt.datetime.now(dt.timezone.utc).strftime(TS_FORMAT)
+        digest = hashlib.sha256(payload).hexdigest()[:12]
+        out_dir = archive_dir() / kind
+        out_dir.mkdir(parents=True, exist_ok=True)
+        path = out_dir / f"{ts}_{digest}.{ext}"
+        if not path.exists():
+            path.write_bytes(payload)
+        print(f"[rec] {kind} -> {path.name} ({len(payload)}B)")
+        return path
+    except Exception as e:
+        print(f"[!] WARN recording {kind}: {e}")
+        return None
+
+
+def parse_archive_name(path: Path):
+    """<ts>_<hash>.<ext> -> (datetime, hash)"""
+    ts, _, digest = path.stem.partition("_")
+    return dt.datetime.strptime(ts, TS_FORMAT).replace(tzinfo=dt.timezone.utc), digest
+
+
+def list_archive(kind: str, root: Path | None = None) -> list[Path]:
+    """ملفات نوع معيّن مرتبة بالوقت (الاسم يبدأ بالـ timestamp)."""
+    d = (root or archive_dir()) / kind
+    if not d.is_dir():
+        return []
+    return sorted(p for p in d.iterdir() if p.is_file() and "_" in p.stem)
@@ -0,0 +1,134 @@
+# scripts/replay.py
+# -*- coding: utf-8 -*-
+"""
+إعادة تشغيل offline للأرشيف اللي يسجّله RECORD=1 (recorder.py) — بدون أي شبكة:
+  parse_liveonsat  على كل صفحة liveonsat مؤرشفة
+  filter_matches   على كل payload يلا شوت + آخر صفحة liveonsat قبله (مثل الإنتاج)
+  collect_live_alerts (منطق المرسل بدون Firebase send)
+
+  python scripts/replay.py                      # كل الأرشيف
+  python scripts/replay.py --repeat 5           # للقياس (أفضل/متوسط وقت)
+  python scripts/replay.py --digest-out a.json  # بصمة المخرجات
+  python scripts/replay.py --compare a.json     # regression: نفس المخرجات بعد التسريع؟
+  python scripts/replay.py --engine rapidfuzz --compare a.json
+"""
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import statistics
+import time
+from pathlib import Path
+
+from json_io import read_json
+from recorder import archive_dir, list_archive, parse_archive_name
+
+
+def _digest(obj) -> str:
+    raw = json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _timed(fn, repeat: int, quiet: bool):
+    """يشغّل fn عدة مرات ويرجّع (آخر نتيجة, قائمة الأوقات بالـ ms)."""
+    times, result = [], None
+    for _ in range(repeat):
+        sink = io.StringIO() if quiet else None
+        with (contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext()):
+            t0 = time.perf_counter()
+            result = fn()
+            times.append((time.perf_counter() - t0) * 1000)
+    return result, times
+
+
+def _summary(name: str, all_times: list[float]):
+    if not all_times:
+        print(f"[i] {name}: no runs")
+        return
+    print(f"[i] {name}: runs={len(all_times)} total={sum(all_times):.1f}ms "
+          f"mean={statistics.mean(all_times):.2f}ms median={statistics.median(all_times):.2f}ms "
+          f"max={max(all_times):.2f}ms")
+
+
+def replay(root: Path, repeat: int = 1, quiet: bool = True, engine: str | None = None) -> dict:
+    # imports هنا حتى --help يشتغل بدون playwright/firebase
+    from scrape_liveonsat_only import parse_liveonsat
+    from filter_json import filter_matches
+    from send_notifications import collect_live_alerts
+
+    html_files = list_archive("liveonsat", root)
+    yalla_files = list_archive("yallashoot", root)
+    print(f"[i] Archive {root}: liveonsat={len(html_files)} yallashoot={len(yalla_files)}")
+
+    digests = {}
+    parse_times, filter_times, notify_times = [], [], []
+
+    # 1) parse كل صفحة
+    parsed = []  # [(ts, name, live_data)]
+    for p in html_files:
+        html = p.read_text(encoding="utf-8")
+        items, times = _timed(lambda: parse_liveonsat(html), repeat, quiet)
+        parse_times.extend(times)
+        ts, _ = parse_archive_name(p)
+        parsed.append((ts, p.name, {"matches": items}))
+        digests[f"liveonsat/{p.name}"] = _digest(items)
+
+    # 2) filter + notify لكل payload يلا مع آخر liveonsat قبله
+    for p in yalla_files:
+        yalla = read_json(p)
+        ts, _ = parse_archive_name(p)
+        live = None
+        for lts, _, ldata in parsed:
+            if lts <= ts:
+                live = ldata
+            else:
+                break
+        live = live or {"matches": []}
+
+        output, times = _timed(lambda: filter_matches(yalla=yalla, live_data=live, write=False, engine=engine), repeat, quiet)
+        filter_times.extend(times)
+        digests[f"filter/{p.name}"] = _digest(output)
+
+        date_str = (output or {}).get("date") or ""
+        alerts, times = _timed(
+            lambda: collect_live_alerts((output or {}).get("matches") or [], date_str, {}), repeat, quiet
+        )
+        notify_times.extend(times)
+        digests[f"notify/{p.name}"] = _digest([a["key"] for a in alerts])
+
+    _summary("parse_liveonsat", parse_times)
+    _summary("filter_matches", filter_times)
+    _summary("collect_live_alerts", notify_times)
+    return digests
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Offline replay of recorded liveonsat/yallashoot payloads")
+    ap.add_argument("--archive", type=Path, default=None, help="مجلد الأرشيف (افتراضي RECORD_DIR أو archive/)")
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--engine", default=None, help="محرك المطابقة (MATCHER_ENGINES)")
+    ap.add_argument("--verbose", action="store_true", help="اطبع مخرجات المراحل")
+    ap.add_argument("--digest-out", type=Path, default=None)
+    ap.add_argument("--compare", type=Path, default=None)
+    args = ap.parse_args()
+
+    digests = replay(args.archive or archive_dir(), repeat=max(1, args.repeat), quiet=not args.verbose, engine=args.engine)
+
+    if args.digest_out:
+        args.digest_out.write_text(json.dumps(digests, indent=2), encoding="utf-8")
+        print(f"[write] {args.digest_out} ({len(digests)} digests)")
+
+    if args.compare:
+        ref = json.loads(args.compare.read_text(encoding="utf-8"))
+        diffs = [k for k in sorted(set(ref) | set(digests)) if ref.get(k) != digests.get(k)]
+        if diffs:
+            print(f"[x] {len(diffs)} outputs differ from {args.compare}:")
+            for k in diffs:
+                print(f"  - {k}: {ref.get(k)} -> {digests.get(k)}")
+            raise SystemExit(1)
+        print(f"[✓] all {len(digests)} outputs match {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
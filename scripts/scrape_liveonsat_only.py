@@ -1,9 +1,15 @@
 # scripts/scrape_liveonsat_only.py
-import os, json, datetime as dt, random, time, re
+import os, datetime as dt, random, time, re
 from pathlib import Path
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import urlopen
 from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright
 
+from json_io import write_json
+from recorder import record_payload
+
 # الأفضل للموبايل لأن HTML أبسط وأقل تغيّر
 DEFAULT_URL = "https://m.liveonsat.com/2day.php"
 
@@ -32,62 +38,111 @@ def clean_text(t: str) -> str:
     return re.sub(r"\s+", " ", t).strip()
 
 
+BROWSER_ARGS = ["--disable-blink-features=AutomationControlled", "--no-sandbox", "--disable-gpu"]
+CONTEXT_OPTIONS = {
+    "locale": "en-GB",
+    "timezone_id": "Asia/Baghdad",
+    "viewport": {"width": 1366, "height": 900},
+    "java_script_enabled": True,
+}
+FETCH_ERROR_HTML = "<html><body>FETCH_ERROR</body></html>"
+
+# وضع المتصفح الدافئ (browser_server.py): إذا مضبوط نطلب الـ HTML منه بدل تشغيل Chromium
+BROWSER_SERVER_URL = os.environ.get("BROWSER_SERVER_URL", "")
+
+
+def launch_browser(p):
+    return p.chromium.launch(headless=True, args=BROWSER_ARGS)
+
+
+def new_scrape_context(browser, ua: str):
+    return browser.new_context(user_agent=ua, **CONTEXT_OPTIONS)
+
+
+def fetch_page_html(ctx, url: str, timeout_ms: int = 90000, debug: bool = False) -> str:
+    """
+    صفحة جديدة داخل ctx → HTML بعد ظهور ST: HH:MM. يرمي استثناء إذا فشل.
+    (مشتركة بين التشغيل العادي و browser_server.py)
+    """
+    page = ctx.new_page()
+    page.set_default_timeout(timeout_ms)
+    try:
+        page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+
+        # انتظر أي ST: 12:34
+        page.wait_for_selector(f"text=/{ST_REGEX}/", timeout=25000)
+
+        # سكرول بسيط (احتياط)
+        for y in (600, 1400, 2400, 3400):
+            page.evaluate(f"window.scrollTo(0, {y});")
+            time.sleep(0.2)
+
+        html = page.content()
+
+        if debug:
+            DEBUG_HTML.write_text(html, encoding="utf-8")
+            page.screenshot(path=str(DEBUG_PNG), full_page=True)
+            print("[LiveOnSat] Saved debug html/png.")
+
+        return html
+
+    except Exception:
+        if debug:
+            try:
+                page.screenshot(path=str(ERROR_PNG), full_page=True)
+            except Exception:
+                pass
+        raise
+    finally:
+        try:
+            page.close()
+        except Exception:
+            pass
+
+
+def get_html_from_browser_server(server_url: str, url: str, timeout_ms: int, debug: bool):
+    """يرجّع HTML من المتصفح الدافئ، أو None إذا السيرفر مو متاح (نرجع للتشغيل العادي)."""
+    q = urlencode({"url": url, "timeout_ms": timeout_ms, "debug": "1" if debug else "0"})
+    try:
+        with urlopen(f"{server_url.rstrip('/')}/html?{q}", timeout=timeout_ms / 1000 + 30) as resp:
+            return resp.read().decode("utf-8")
+    except HTTPError as e:
+        # السيرفر شغّال بس الصفحة فشلت — نفس سلوك التشغيل العادي
+        print(f"[LiveOnSat] browser server error {e.code}: {e.read()[:200]!r}")
+        return FETCH_ERROR_HTML
+    except Exception as e:
+        print(f"[LiveOnSat] browser server unavailable ({e}) — cold launch")
+        return None
+
+
 def get_html_with_playwright(url: str, timeout_ms: int = 90000) -> str:
     """
     يجيب HTML من LiveOnSat (الموبايل أو الديسكتوب).
     ما يعتمد على #selecttz نهائياً (لان تغيّر/اختفى مرات).
     ينتظر وجود ST: HH:MM كإشارة إن البيانات تحمّلت.
+    إذا BROWSER_SERVER_URL مضبوط يستخدم المتصفح الدافئ (بدون كلفة تشغيل Chromium).
     """
-    ua = random.choice(UA_POOL)
     debug = os.environ.get("DEBUG_LIVEONSAT") == "1"
 
+    if BROWSER_SERVER_URL:
+        print(f"[LiveOnSat] Warm browser GET {url} via {BROWSER_SERVER_URL} debug={debug}")
+        html = get_html_from_browser_server(BROWSER_SERVER_URL, url, timeout_ms, debug)
+        if html is not None:
+            return html
+
+    ua = random.choice(UA_POOL)
     print(f"[LiveOnSat] Playwright GET {url} UA={ua[:35]}... debug={debug}")
 
     with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=True,
-            args=["--disable-blink-features=AutomationControlled", "--no-sandbox", "--disable-gpu"],
-        )
-        ctx = browser.new_context(
-            user_agent=ua,
-            locale="en-GB",
-            timezone_id="Asia/Baghdad",
-            viewport={"width": 1366, "height": 900},
-            java_script_enabled=True,
-        )
-        page = ctx.new_page()
-        page.set_default_timeout(timeout_ms)
-
+        browser = launch_browser(p)
+        ctx = new_scrape_context(browser, ua)
         try:
-            page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
-
-            # انتظر أي ST: 12:34
-            page.wait_for_selector(f"text=/{ST_REGEX}/", timeout=25000)
-
-            # سكرول بسيط (احتياط)
-            for y in (600, 1400, 2400, 3400):
-                page.evaluate(f"window.scrollTo(0, {y});")
-                time.sleep(0.2)
-
-            html = page.content()
-
-            if debug:
-                DEBUG_HTML.write_text(html, encoding="utf-8")
-                page.screenshot(path=str(DEBUG_PNG), full_page=True)
-                print("[LiveOnSat] Saved debug html/png.")
-
-            browser.close()
-            return html
-
+            return fetch_page_html(ctx, url, timeout_ms, debug)
         except Exception as e:
             print(f"[LiveOnSat] FATAL ERROR: {e}")
-            if debug:
-                try:
-                    page.screenshot(path=str(ERROR_PNG), full_page=True)
-                except Exception:
-                    pass
+            return FETCH_ERROR_HTML
+        finally:
             browser.close()
-            return "<html><body>FETCH_ERROR</body></html>"
 
 
 def parse_liveonsat(html: str):
@@ -174,13 +229,15 @@ def main():
     url = os.environ.get("FORCE_URL") or os.environ.get("LOS_URL") or DEFAULT_URL
 
     html = get_html_with_playwright(url)
+    if "FETCH_ERROR" not in html:
+        # RECORD=1 → أرشفة الصفحة لإعادة التشغيل offline (replay.py)
+        record_payload("liveonsat", html.encode("utf-8"), "html")
     items = parse_liveonsat(html)
 
     today = dt.date.today().isoformat()
     out = {"date": today, "source_url": url, "matches": items}
 
-    OUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    OUT_PATH.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+    write_json(OUT_PATH, out)
     print(f"[write] {OUT_PATH} with {len(items)} matches.")
 
 
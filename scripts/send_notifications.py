@@ -1,6 +1,5 @@
 # scripts/send_notifications.py
 # -*- coding: utf-8 -*-
-import json
 import os
 import re
 import time
@@ -10,12 +9,24 @@ from datetime import datetime
 import firebase_admin
 from firebase_admin import credentials, messaging
 
+from json_io import read_json, write_json
+
 # ===== إعدادات الملفات =====
 REPO_ROOT = Path(__file__).resolve().parents[1]
 MATCHES_JSON = REPO_ROOT / "matches" / "filtered_matches.json"
 NOTIFIED_JSON = REPO_ROOT / "matches" / "notified.json"
 SERVICE_KEY_PATH = REPO_ROOT / "serviceAccountKey.json"  # fallback لو موجود داخل الريبو
 
+# ===== إعدادات الـ topics =====
+# رسالة وحدة لكل بطولة (comp_topic من filter_json). إذا الـ topic العام مفعّل تنرسل بـ condition:
+#   'comp_x' in topics || 'matches' in topics
+# فالجهاز المشترك بالاثنين يستلمها مرة وحدة (FCM يسلّم الـ condition مرة لكل جهاز).
+# ملاحظة: طول ما العام مفعّل، كل جهاز مشترك بيه يستلم كل التنبيهات — تقليل الحجم الفعلي
+# يصير بس لما الأجهزة تنتقل لـ comp_* ويتطفّى العام بـ NOTIFY_CATCHALL_TOPIC="".
+CATCHALL_TOPIC = os.environ.get("NOTIFY_CATCHALL_TOPIC", "matches").strip()
+FCM_BATCH_MAX = 500          # حد send_each
+GROUP_BODY_MAX_LINES = 5     # أكثر من هذا: "+N مباريات أخرى"
+
 # ===== تهيئة Firebase Admin =====
 def init_firebase():
     """يهيئ Firebase باستخدام GOOGLE_APPLICATION_CREDENTIALS أو ملف fallback."""
@@ -55,15 +66,14 @@ def load_json(path: Path, default):
     if not path.exists():
         return default
     try:
-        return json.loads(path.read_text(encoding="utf-8"))
+        return read_json(path)
     except Exception as e:
         print(f"⚠️  ملف JSON غير صالح ({path}): {e}")
         return default
 
 def save_json(path: Path, data):
     try:
-        path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+        write_json(path, data)
     except Exception as e:
         print(f"⚠️  فشل حفظ {path}: {e}")
 
@@ -71,6 +81,42 @@ def match_key(date_str: str, home: str, away: str, comp: str, kickoff: str) -> s
     """مفتاح فريد لعدم تكرار الإرسال لنفس المباراة في نفس اليوم/الحدث."""
     return "|".join([date_str, norm(home), norm(away), norm(comp), norm(kickoff)])
 
+def collect_live_alerts(matches: list, date_str: str, notified: dict) -> list[dict]:
+    """
+    يختار المباريات الـ Live اللي ما انبعث لها إشعار (بدون أي إرسال).
+    يرجّع [{"key", "title", "body", "match"}] — يستخدمه main() و replay.py.
+    """
+    alerts = []
+    pending = set()  # نفس المفتاح مرتين بنفس الدفعة → إشعار واحد
+    for m in matches:
+        home = m.get("home_team") or "فريق A"
+        away = m.get("away_team") or "فريق B"
+        status = m.get("status_text") or ""
+        comp = m.get("competition") or ""
+        kickoff = m.get("kickoff_baghdad") or m.get("kickoff") or ""
+
+        key = match_key(date_str, home, away, comp, kickoff)
+
+        if is_live(status) and not notified.get(key) and key not in pending:
+            pending.add(key)
+            title = "📺 شاهد الآن"
+            body_parts = [f"{home} × {away}"]
+            if comp:
+                body_parts.append(f"— {comp}")
+            if kickoff:
+                body_parts.append(f"({kickoff})")
+            body = " ".join(body_parts)
+            alerts.append({
+                "key": key, "title": title, "body": body, "match": m,
+                "line": f"{home} × {away}" + (f" ({kickoff})" if kickoff else ""),
+                "comp": comp,
+                # ملفات قديمة بدون comp_topic → العام
+                "topic": m.get("comp_topic") or CATCHALL_TOPIC or "matches",
+            })
+        else:
+            print(f"skip: {home} vs {away} | status='{status}' | already_notified={bool(notified.get(key) or key in pending)}")
+    return alerts
+
 # ===== إرسال إشعار =====
 def send_topic_notification(title: str, body: str, topic: str = "matches", dry: bool = False):
     if dry:
@@ -94,6 +140,73 @@ def send_token_notification(title: str, body: str, token: str, dry: bool = False
     resp = messaging.send(msg)
     print(f"✅ sent to token: {resp} | {title} — {body}")
 
+# ===== fan-out حسب البطولة + إرسال مجمّع =====
+def group_alerts_by_topic(alerts: list[dict]) -> dict:
+    """topic البطولة -> alerts. كل إشعار بمجموعة وحدة بس (العام يدخل بالـ condition مو كرسالة ثانية)."""
+    groups = {}
+    for a in alerts:
+        groups.setdefault(a["topic"], []).append(a)
+    return groups
+
+def topic_target(topic: str) -> dict:
+    """وجهة رسالة البطولة: topic لحاله، أو condition مع العام حتى ما يوصل الجهاز نسختين."""
+    if CATCHALL_TOPIC and topic != CATCHALL_TOPIC:
+        return {"condition": f"'{topic}' in topics || '{CATCHALL_TOPIC}' in topics"}
+    return {"topic": topic}
+
+def build_group_notification(alerts: list[dict]) -> tuple[str, str]:
+    """مباراة وحدة → نفس النص القديم. أكثر → إشعار واحد فيه سطر لكل مباراة."""
+    if len(alerts) == 1:
+        return alerts[0]["title"], alerts[0]["body"]
+    title = f"📺 شاهد الآن — {len(alerts)} مباريات"
+    comps = {a["comp"] for a in alerts}
+    lines = [a["line"] for a in alerts[:GROUP_BODY_MAX_LINES]]
+    if len(alerts) > GROUP_BODY_MAX_LINES:
+        lines.append(f"+{len(alerts) - GROUP_BODY_MAX_LINES} مباريات أخرى")
+    if len(comps) == 1 and next(iter(comps)):
+        lines.insert(0, next(iter(comps)))
+    return title, "\n".join(lines)
+
+def send_topic_batch(groups: dict, dry: bool = False) -> dict:
+    """
+    رسالة وحدة لكل topic بطولة بهذا الـ tick، تنرسل بـ send_each (دفعات 500).
+    يرجّع topic -> True/False (نجح أو لا) — كل إشعار بـ topic واحد، فالفشل يعيد بس مبارياته.
+    """
+    topics = list(groups)
+    messages = []
+    for topic in topics:
+        title, body = build_group_notification(groups[topic])
+        ids = [a["match"].get("match_id") or "" for a in groups[topic]]
+        target = topic_target(topic)
+        if dry:
+            print(f"🧪 DRY_RUN — كان راح يُرسل ({next(iter(target.values()))}): {title} — {body!r}")
+            continue
+        messages.append(messaging.Message(
+            notification=messaging.Notification(title=title, body=body),
+            data={"topic": topic, "match_ids": ",".join(i for i in ids if i)},
+            **target,
+        ))
+
+    if dry:
+        return {t: True for t in topics}
+
+    results = {}
+    for start in range(0, len(messages), FCM_BATCH_MAX):
+        chunk_topics = topics[start:start + FCM_BATCH_MAX]
+        try:
+            resp = messaging.send_each(messages[start:start + FCM_BATCH_MAX])
+        except Exception as e:
+            print(f"⚠️ فشل إرسال الدفعة: {e}")
+            results.update({t: False for t in chunk_topics})
+            continue
+        for topic, r in zip(chunk_topics, resp.responses):
+            results[topic] = r.success
+            if r.success:
+                print(f"✅ sent to topic {topic}: {r.message_id} ({len(groups[topic])} match(es))")
+            else:
+                print(f"⚠️ topic {topic} failed: {r.exception}")
+    return results
+
 def subscribe_token_to_topic(token: str, topic: str = "matches"):
     """يسجّل التوكن في Topic عبر Firebase Admin (مفيد لفحص الاشتراك)."""
     resp = messaging.subscribe_to_topic([token], topic)
@@ -130,33 +243,25 @@ def main():
     changed = False
     sent_count = 0
 
-    for m in matches:
-        home = m.get("home_team") or "فريق A"
-        away = m.get("away_team") or "فريق B"
-        status = m.get("status_text") or ""
-        comp = m.get("competition") or ""
-        kickoff = m.get("kickoff_baghdad") or m.get("kickoff") or ""
+    alerts = collect_live_alerts(matches, date_str, notified)
+    groups = group_alerts_by_topic(alerts)
+    if groups and CATCHALL_TOPIC:
+        print(f"ℹ️ topic العام '{CATCHALL_TOPIC}' مفعّل: المشتركين بيه يستلمون كل التنبيهات "
+              f"(NOTIFY_CATCHALL_TOPIC=\"\" يطفّيه)")
+    results = send_topic_batch(groups, dry=dry_run) if groups else {}
 
-        key = match_key(date_str, home, away, comp, kickoff)
-
-        if is_live(status) and not notified.get(key):
-            title = "📺 شاهد الآن"
-            body_parts = [f"{home} × {away}"]
-            if comp:
-                body_parts.append(f"— {comp}")
-            if kickoff:
-                body_parts.append(f"({kickoff})")
-            body = " ".join(body_parts)
-
-            try:
-                send_topic_notification(title, body, topic="matches", dry=dry_run)
-                notified[key] = True
+    # كل إشعار عنده وجهة وحدة (topic البطولة، ومعه العام بالـ condition): ينحسب مُرسل بس إذا
+    # وجهته نجحت — الفاشل ما ينكتب بـ notified.json فينعاد بالـ tick الجاي.
+    for topic, ok in results.items():
+        if not ok:
+            continue
+        for alert in groups[topic]:
+            if not notified.get(alert["key"]):
+                notified[alert["key"]] = True
                 changed = True
                 sent_count += 1
-            except Exception as e:
-                print(e)
-        else:
-            print(f"skip: {home} vs {away} | status='{status}' | already_notified={bool(notified.get(key))}")
+    if groups:
+        print(f"📦 {len(alerts)} مباراة → {len(groups)} رسالة topic ({sum(results.values())} نجحت)")
 
     # 5) حفظ السجل
     if changed and not dry_run:
@@ -0,0 +1,278 @@
+# scripts/serve_matches.py
+# -*- coding: utf-8 -*-
+"""
+سيرفر HTTP محلي (stdlib فقط) يقدّم المباريات من الذاكرة:
+  /matches            النسخة الكاملة (filtered_matches.json)
+  /matches/compact    النسخة المختصرة (compact_payload: بدون merge_debug + خريطة شعارات)
+  /matches/delta      آخر delta (filtered_matches.delta.json)
+  /raw                liveonsat_raw.json
+  /healthz            حالة السيرفر
+فلترة حسب البطولة: ?comp=UEFA-CL (قيم comp_bucket) على /matches و /matches/compact.
+
+- الملفات تنقرأ مرة وحدة وتنعاد قراءتها بس لما يتغير mtime (thread بالخلفية)،
+  فكل طلب يُخدم من الذاكرة بدون لمس القرص.
+- ETag قوي (sha256 للمحتوى) + If-None-Match → 304 (مقارنة weak: W/ من بروكسي/CDN مقبول).
+- keep-alive بمهلة خمول (SERVE_IDLE_TIMEOUT) حتى العملاء الخاملين ما يحجزون threads للأبد.
+- gzip محسوب مسبقاً لكل جسم (Accept-Encoding: gzip مع احترام q-values).
+"""
+import gzip
+import hashlib
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+from filter_json import (
+    DELTA_PATH,
+    LIVEONSAT_PATH,
+    OUTPUT_PATH,
+    comp_bucket,
+    compact_payload,
+    dumps_compact,
+)
+from json_io import dumps, read_json
+
+# ========= إعدادات =========
+HOST = os.environ.get("SERVE_HOST", "0.0.0.0")
+PORT = int(os.environ.get("SERVE_PORT", "8080"))
+RELOAD_INTERVAL_S = float(os.environ.get("SERVE_RELOAD_INTERVAL", "2"))
+CACHE_MAX_AGE_S = int(os.environ.get("SERVE_MAX_AGE", "30"))
+# keep-alive: اتصال خامل أكثر من هذا ينسد (كل اتصال مفتوح ماسك thread)
+IDLE_TIMEOUT_S = float(os.environ.get("SERVE_IDLE_TIMEOUT", "15"))
+LISTEN_BACKLOG = int(os.environ.get("SERVE_BACKLOG", "1024"))
+
+ALL_BUCKETS = ("UEFA-CL", "AFC-CL", "ENG-EFL", "MAR-BOT", "OTHER")
+
+
+# ========= جسم جاهز للإرسال =========
+class Body:
+    """bytes جاهزة + نسخة gzip + ETag — تنحسب مرة وحدة عند إعادة التحميل."""
+    __slots__ = ("raw", "gz", "etag", "etag_gz")
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        self.gz = gzip.compress(raw, compresslevel=6, mtime=0)
+        digest = hashlib.sha256(raw).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.etag_gz = f'"{digest}-gz"'
+
+
+def _read_json(path: Path):
+    try:
+        return read_json(path)
+    except Exception as e:
+        print(f"[!] WARN reading {path.name}: {e}")
+        return None
+
+
+def _mtime(path: Path):
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+# ========= الكاش =========
+class MatchStore:
+    """
+    يحتفظ بآخر نسخة من الملفات بالذاكرة. الاستبدال ذرّي (dict جديد كامل)،
+    فالـ handlers يقرون بدون lock.
+    """
+
+    def __init__(self):
+        self._mtimes = {}
+        self.bodies: dict[str, Body] = {}
+        self.loaded_at = None
+
+    def _build(self) -> dict:
+        bodies = {}
+
+        filtered = _read_json(OUTPUT_PATH) or {"date": None, "matches": []}
+        matches = filtered.get("matches", []) or []
+        buckets = [comp_bucket(m.get("competition") or "") for m in matches]
+
+        bodies["full"] = Body(dumps(filtered))
+        bodies["compact"] = Body(dumps_compact(compact_payload(filtered.get("date"), matches)))
+
+        # نسخ لكل bucket محسوبة مسبقاً (عددها ثابت وقليل)
+        for b in ALL_BUCKETS:
+            sel = [i for i, mb in enumerate(buckets) if mb == b]
+            full_b = dict(filtered, matches=[matches[i] for i in sel])
+            bodies[f"full:{b}"] = Body(dumps(full_b))
+            bodies[f"compact:{b}"] = Body(dumps_compact(compact_payload(filtered.get("date"), full_b["matches"])))
+
+        delta = _read_json(DELTA_PATH)
+        bodies["delta"] = Body(dumps_compact(delta if delta is not None else {"full_refresh": True}))
+
+        raw = _read_json(LIVEONSAT_PATH) or {"matches": []}
+        bodies["raw"] = Body(dumps(raw))
+        return bodies
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        paths = (OUTPUT_PATH, DELTA_PATH, LIVEONSAT_PATH)
+        mtimes = {p: _mtime(p) for p in paths}
+        if not force and mtimes == self._mtimes:
+            return False
+        self.bodies = self._build()
+        self._mtimes = mtimes
+        self.loaded_at = time.time()
+        print(f"[i] Loaded match files ({len(self.bodies)} bodies)")
+        return True
+
+    def watch(self, interval_s: float = RELOAD_INTERVAL_S):
+        def loop():
+            while True:
+                time.sleep(interval_s)
+                try:
+                    self.reload_if_changed()
+                except Exception as e:
+                    print(f"[!] WARN reload failed: {e}")
+        t = threading.Thread(target=loop, name="match-store-watch", daemon=True)
+        t.start()
+        return t
+
+
+STORE = MatchStore()
+
+ROUTES = {
+    "/matches": "full",
+    "/matches/compact": "compact",
+    "/matches/delta": "delta",
+    "/raw": "raw",
+}
+FILTERABLE = {"full", "compact"}
+
+
+# ========= الـ handler =========
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag[:2].upper() == "W/" else tag
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    """If-None-Match بمقارنة weak (RFC 9110): W/"x" يطابق "x" — البروكسيات/CDN تضعّف الـ ETag."""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    want = _opaque_tag(etag)
+    return any(_opaque_tag(t) == want for t in header.split(","))
+
+
+def accepts_gzip(header: str | None) -> bool:
+    """Accept-Encoding مع q-values: "gzip;q=0" رفض صريح، و "*" يغطي gzip إذا مو مذكور."""
+    q_by_coding = {}
+    for item in (header or "").split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            k, _, v = param.partition("=")
+            if k.strip().lower() == "q":
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        q_by_coding[coding] = q
+    q = q_by_coding.get("gzip", q_by_coding.get("x-gzip", q_by_coding.get("*", 0.0)))
+    return q > 0
+
+
+class MatchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "liveonsat-serve/1"
+    # مهلة على كل قراءة من السوكت: الاتصال الخامل بين طلبين ينسد بعدها
+    timeout = IDLE_TIMEOUT_S
+
+    def log_message(self, fmt, *args):
+        # ما نطبع كل طلب (آلاف العملاء) — فعّل بـ SERVE_ACCESS_LOG=1
+        if os.environ.get("SERVE_ACCESS_LOG") == "1":
+            super().log_message(fmt, *args)
+
+    def _send_bytes(self, code: int, payload: bytes = b"", headers: dict | None = None):
+        self.send_response(code)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        # 304 بدون Content-Length: صفر معناه إن التمثيل نفسه فارغ (يخرّب الكاش/البروكسي)
+        if code != 304:
+            self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if payload and self.command != "HEAD":
+            self.wfile.write(payload)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        path = parts.path.rstrip("/") or "/"
+
+        if path == "/healthz":
+            info = {"ok": True, "loaded_at": STORE.loaded_at}
+            self._send_bytes(200, dumps_compact(info), {"Content-Type": "application/json"})
+            return
+
+        key = ROUTES.get(path)
+        if key is None:
+            self._send_bytes(404, b'{"error":"not found"}', {"Content-Type": "application/json"})
+            return
+
+        comp = (parse_qs(parts.query).get("comp") or [""])[0].strip().upper()
+        if comp:
+            if key not in FILTERABLE or comp not in ALL_BUCKETS:
+                self._send_bytes(400, b'{"error":"bad comp"}', {"Content-Type": "application/json"})
+                return
+            key = f"{key}:{comp}"
+
+        body = STORE.bodies.get(key)
+        if body is None:
+            self._send_bytes(503, b'{"error":"not loaded"}', {"Content-Type": "application/json"})
+            return
+
+        use_gz = accepts_gzip(self.headers.get("Accept-Encoding"))
+        etag = body.etag_gz if use_gz else body.etag
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={CACHE_MAX_AGE_S}",
+            "Vary": "Accept-Encoding",
+        }
+
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            self._send_bytes(304, b"", headers)
+            return
+
+        headers["Content-Type"] = "application/json; charset=utf-8"
+        if use_gz:
+            headers["Content-Encoding"] = "gzip"
+            self._send_bytes(200, body.gz, headers)
+        else:
+            self._send_bytes(200, body.raw, headers)
+
+
+# ========= الرئيسي =========
+class MatchServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # الافتراضي 5 — موجة اتصالات من آلاف العملاء تنرفض/تتأخر بالـ SYN backlog
+    request_queue_size = LISTEN_BACKLOG
+
+
+def main():
+    STORE.reload_if_changed(force=True)
+    STORE.watch()
+    httpd = MatchServer((HOST, PORT), MatchHandler)
+    print(f"[i] Serving matches on http://{HOST}:{PORT} (reload every {RELOAD_INTERVAL_S}s, "
+          f"idle timeout {IDLE_TIMEOUT_S:.0f}s)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()